@@ -0,0 +1,88 @@
+"""Benchmark control command latency over the cloud and the LAN."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+from homeassistant import core
+
+from custom_components import drumfilter
+from custom_components.drumfilter.hub import DrumFilterHub
+from tests.common import point_at
+
+from .fake_cloud import FakeDrumFilterCloud
+
+async def _async_time_commands(
+    api: drumfilter.DrumFilterAPI, commands: int
+) -> list[float]:
+    """Send ``commands`` control commands and return each latency in ms."""
+    uid = next(iter(api.devices))
+    latencies = []
+    for index in range(commands):
+        start = time.perf_counter()
+        await api.async_send_command(uid, interval=60 + index % 10)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+async def bench_command(
+    device: FakeDrumFilterCloud, device_url: str, commands: int
+) -> dict[str, dict[str, Any]]:
+    """Time control commands over each transport setup."""
+    parts = urlsplit(device_url)
+    results: dict[str, dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = core.HomeAssistant(config_dir)
+        hub = DrumFilterHub(hass)
+
+        # 只走云端、连接局域网设备、局域网设备停止后回退到云端
+        for mode in ("cloud", "local", "fallback"):
+            api = drumfilter.DrumFilterAPI(hass, "bench", hub)
+            if mode != "cloud":
+                api.attach_local(parts.hostname, parts.port)
+            if mode == "fallback":
+                device.stop()
+            await api.async_get_data()
+            latencies = await _async_time_commands(api, commands)
+            results[mode] = {
+                "median_ms": statistics.median(latencies),
+                "max_ms": max(latencies),
+                "transport": api.last_transport,
+            }
+
+        await hub.async_close()
+        await hass.async_stop(force=True)
+    return results
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="DrumFilter command benchmark")
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--cloud-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    cloud = FakeDrumFilterCloud(latency=args.cloud_latency)
+    device = FakeDrumFilterCloud(local_token="bench")
+    point_at(cloud.start())
+    device_url = device.start()
+    try:
+        result = asyncio.run(bench_command(device, device_url, args.commands))
+    finally:
+        cloud.stop()
+        device.stop()
+
+    print(f"{'mode':>9} {'median ms':>10} {'max ms':>9} {'transport':>10}")
+    for mode, values in result.items():
+        print(
+            f"{mode:>9} {values['median_ms']:>10.1f} {values['max_ms']:>9.1f} "
+            f"{values['transport']:>10}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Benchmark the DrumFilter poll path against the fake cloud."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+
+from homeassistant import core
+
+from custom_components import drumfilter
+from custom_components.drumfilter.const import (
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+)
+from custom_components.drumfilter.hub import DrumFilterHub
+from tests.common import point_at
+
+from .fake_cloud import FakeDrumFilterCloud
+
+INTEGRATION_FILES = "*custom_components/drumfilter/*"
+
+def _integration_memory() -> int:
+    """Return bytes currently allocated from integration code."""
+    # 未启用 tracemalloc 时（例如在测试中）不统计内存
+    if not tracemalloc.is_tracing():
+        return 0
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(True, INTEGRATION_FILES)]
+    )
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+async def bench_poll(
+    cloud: FakeDrumFilterCloud, devices: int, rounds: int
+) -> dict[str, Any]:
+    """Run the poll benchmark for one fleet size."""
+    tokens = max(devices // cloud.devices_per_token, 1)
+    devices = tokens * cloud.devices_per_token
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = core.HomeAssistant(config_dir)
+        hub = DrumFilterHub(hass)
+        memory_before = _integration_memory()
+
+        coordinators = []
+        for index in range(tokens):
+            api = drumfilter.DrumFilterAPI(hass, f"bench{devices}-{index}", hub)
+            coordinator = drumfilter.DrumFilterDataUpdateCoordinator(
+                hass,
+                api=api,
+                storage_key=f"bench{devices}-{index}",
+                min_interval=DEFAULT_MIN_POLL_INTERVAL,
+                max_interval=DEFAULT_MAX_POLL_INTERVAL,
+            )
+            coordinators.append(coordinator)
+
+        await asyncio.gather(*(c.async_refresh() for c in coordinators))
+        memory_per_device = (_integration_memory() - memory_before) / devices
+
+        cloud.requests.clear()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        for _ in range(rounds):
+            await asyncio.gather(*(c.async_refresh() for c in coordinators))
+        cpu = time.thread_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+
+        failed = sum(not c.last_update_success for c in coordinators)
+        pool = hub.metrics.as_dict()
+        await hub.async_close()
+        await hass.async_stop(force=True)
+
+    requests = sum(
+        count for endpoint, count in cloud.requests.items() if endpoint != "not_modified"
+    )
+    return {
+        "devices": devices,
+        "requests": requests,
+        "requests_per_s": requests / wall if wall else 0.0,
+        "loop_ms_per_poll": cpu * 1000 / (devices * rounds),
+        "kib_per_device": memory_per_device / 1024,
+        "failed": failed,
+        "connections": pool["connections_created"],
+        "pool_waits": pool["pool_waits"],
+    }
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="DrumFilter poll benchmark")
+    parser.add_argument("--devices", default="1,10,100,500")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--records", type=int, default=100)
+    parser.add_argument("--no-batch", action="store_true")
+    parser.add_argument("--honour-since", action="store_true")
+    parser.add_argument("--etag", action="store_true")
+    parser.add_argument("--per-token", type=int, default=1)
+    parser.add_argument("--max-kib-per-device", type=float, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    cloud = FakeDrumFilterCloud(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        record_count=args.records,
+        batch=not args.no_batch,
+        honour_since=args.honour_since,
+        etag=args.etag,
+        devices_per_token=args.per_token,
+    )
+    point_at(cloud.start())
+    tracemalloc.start()
+
+    print(
+        f"{'devices':>8} {'requests':>9} {'req/s':>9} "
+        f"{'loop ms/poll':>13} {'KiB/device':>11} {'failed':>7} "
+        f"{'conns':>6} {'waits':>6}"
+    )
+    over_budget = []
+    try:
+        for devices in (int(value) for value in args.devices.split(",")):
+            result = asyncio.run(bench_poll(cloud, devices, args.rounds))
+            if (
+                args.max_kib_per_device is not None
+                and result["kib_per_device"] > args.max_kib_per_device
+            ):
+                over_budget.append(devices)
+            print(
+                f"{result['devices']:>8} {result['requests']:>9} "
+                f"{result['requests_per_s']:>9.1f} {result['loop_ms_per_poll']:>13.3f} "
+                f"{result['kib_per_device']:>11.1f} {result['failed']:>7} "
+                f"{result['connections']:>6} {result['pool_waits']:>6}"
+            )
+    finally:
+        cloud.stop()
+
+    if over_budget:
+        raise SystemExit(
+            f"Memory per device above {args.max_kib_per_device} KiB for "
+            f"{', '.join(map(str, over_budget))} device(s)"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Benchmark DrumFilter import and config entry setup time."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import logging
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import MappingProxyType
+from typing import Any
+
+from homeassistant import config_entries
+
+from custom_components.drumfilter.config_flow import DrumFilterConfigFlow
+from custom_components.drumfilter.const import DOMAIN
+from tests.common import async_start_hass, point_at
+
+from .fake_cloud import FakeDrumFilterCloud
+
+# 集成初始化之前 Home Assistant 已经加载的模块，导入耗时只计算集成自身
+PRELOADED = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.device_registry",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.service",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+)
+
+def measure_import(module: str) -> float:
+    """Return the cumulative import time of ``module`` in milliseconds."""
+    code = "".join(f"import {name};" for name in PRELOADED) + f"import {module}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    for line in result.stderr.splitlines():
+        _, _, cumulative, name = (part.strip() for part in line.replace(":", "|", 1).split("|"))
+        if name == module:
+            return int(cumulative) / 1000
+    raise RuntimeError(f"{module} not found in import time output")
+
+def _config_entry(title: str, data: dict[str, Any]) -> config_entries.ConfigEntry:
+    """Build a config entry at the current version of the integration."""
+    fields: dict[str, Any] = {
+        "version": DrumFilterConfigFlow.VERSION,
+        "minor_version": 1,
+        "domain": DOMAIN,
+        "title": title,
+        "data": data,
+        "options": {},
+        "source": config_entries.SOURCE_USER,
+        "unique_id": None,
+        "discovery_keys": MappingProxyType({}),
+    }
+    # 较新版本的 Home Assistant 要求传入全部字段，旧版本没有 discovery_keys
+    accepted = inspect.signature(config_entries.ConfigEntry).parameters
+    return config_entries.ConfigEntry(
+        **{key: value for key, value in fields.items() if key in accepted}
+    )
+
+async def bench_setup(cloud: FakeDrumFilterCloud, entries: int) -> dict[str, Any]:
+    """Set up ``entries`` devices through each path and time them."""
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_start_hass(config_dir)
+
+        # 首次加载集成的导入开销不计入单个条目
+        warmup = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": "user"}, data={"token": "warmup"}
+        )
+        await hass.config_entries.async_remove(warmup["result"].entry_id)
+
+        # flow：用户配置流程，即验证 Token 加上条目初始化
+        cloud.requests.clear()
+        start = time.perf_counter()
+        for index in range(entries):
+            await hass.config_entries.flow.async_init(
+                DOMAIN, context={"source": "user"}, data={"token": f"flow{index}"}
+            )
+        results["flow"] = (time.perf_counter() - start, sum(cloud.requests.values()))
+
+        # cold：初始化没有缓存的已有条目
+        added = []
+        for index in range(entries):
+            added.append(_config_entry(f"cold{index}", {"token": f"cold{index}"}))
+        cloud.requests.clear()
+        start = time.perf_counter()
+        for entry in added:
+            await hass.config_entries.async_add(entry)
+        results["cold"] = (time.perf_counter() - start, sum(cloud.requests.values()))
+
+        # cached：重新加载状态已在磁盘缓存中的条目
+        cloud.requests.clear()
+        start = time.perf_counter()
+        for entry in added:
+            await hass.config_entries.async_reload(entry.entry_id)
+        results["cached"] = (time.perf_counter() - start, sum(cloud.requests.values()))
+
+        await hass.async_stop(force=True)
+
+    return {
+        path: {"ms": duration * 1000 / entries, "queries": requests / entries}
+        for path, (duration, requests) in results.items()
+    }
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="DrumFilter setup benchmark")
+    parser.add_argument("--entries", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    imports = [measure_import("custom_components.drumfilter") for _ in range(args.repeat)]
+    print(f"import custom_components.drumfilter: {statistics.median(imports):.1f} ms")
+
+    logging.basicConfig(level=logging.CRITICAL)
+    cloud = FakeDrumFilterCloud(latency=args.latency)
+    point_at(cloud.start())
+    try:
+        result = asyncio.run(bench_setup(cloud, args.entries))
+    finally:
+        cloud.stop()
+
+    print(f"{'path':>8} {'ms/entry':>9} {'queries/entry':>14}")
+    for path, values in result.items():
+        print(f"{path:>8} {values['ms']:>9.1f} {values['queries']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""In-process stand-in for the DrumFilter cloud API."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from typing import Any
+
+from aiohttp import web
+
+REASONS = ("timing", "manual", "limit")
+
+class FakeDrumFilterCloud:
+    """Fake DrumFilter cloud holding simulated devices per token."""
+
+    # 在独立线程的事件循环中运行，不占用被测的 Home Assistant 循环
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        record_count: int = 100,
+        batch: bool = True,
+        honour_since: bool = False,
+        etag: bool = False,
+        devices_per_token: int = 1,
+        batch_status: int | None = None,
+        local_token: str | None = None,
+    ) -> None:
+        """Initialize the fake cloud."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.record_count = record_count
+        self.batch = batch
+        self.honour_since = honour_since
+        self.etag = etag
+        self.devices_per_token = devices_per_token
+        # 批量查询返回该状态码，batch_omit 中的 Token 不出现在批量结果中
+        self.batch_status = batch_status
+        self.batch_omit: set[str] = set()
+        self.control_status: int | None = None
+        # 设置后模拟局域网内的设备，只为该 Token 应答 /api/challenge
+        self.local_token = local_token
+        self.subscribers: dict[str, set[web.WebSocketResponse]] = {}
+        self.requests: Counter[str] = Counter()
+        self.accounts: dict[str, list[dict[str, Any]]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._runner: web.AppRunner | None = None
+        self._thread: threading.Thread | None = None
+
+    def account(self, token: str) -> list[dict[str, Any]]:
+        """Return the simulated devices of a token, creating them on first use."""
+        if token not in self.accounts:
+            names = (
+                [token]
+                if self.devices_per_token == 1
+                else [f"{token}-{i}" for i in range(self.devices_per_token)]
+            )
+            self.accounts[token] = [self._new_device(name) for name in names]
+        return self.accounts[token]
+
+    def _new_device(self, name: str) -> dict[str, Any]:
+        """Create a simulated device."""
+        now = int(time.time())
+        return {
+            "uid": f"uid-{name}",
+            "name": f"Filter {name}",
+            "model": "DrumFilter",
+            "interval": 60,
+            "network": "online",
+            "records": [
+                {"time": now - (self.record_count - i) * 3600, "reason": REASONS[i % 3]}
+                for i in range(self.record_count)
+            ],
+        }
+
+    def _payload(self, query: dict[str, Any]) -> dict[str, Any]:
+        """Build the query response for one token."""
+        since = query.get("since")
+        devices = [
+            self._device_payload(device, since) for device in self.account(query["token"])
+        ]
+        if len(devices) == 1:
+            return devices[0]
+        return {"devices": devices}
+
+    def _device_payload(self, device: dict[str, Any], since: float | None) -> dict[str, Any]:
+        """Build the payload of one device."""
+        if not (self.honour_since and since is not None):
+            return device
+        return {
+            **device,
+            "records": [r for r in device["records"] if r["time"] > since],
+            "total": len(device["records"]),
+        }
+
+    async def _async_simulate(self, endpoint: str) -> None:
+        """Count the request, wait and maybe fail."""
+        self.requests[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise web.HTTPInternalServerError()
+
+    async def _handle_query(self, request: web.Request) -> web.Response:
+        """Handle a single device query."""
+        await self._async_simulate("query")
+        payload = self._payload(await request.json())
+        if not self.etag:
+            return web.json_response(payload)
+
+        body = json.dumps(payload)
+        etag = f'"{hashlib.sha1(body.encode()).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.requests["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=body, content_type="application/json", headers={"ETag": etag}
+        )
+
+    async def _handle_query_batch(self, request: web.Request) -> web.Response:
+        """Handle a batched query."""
+        if not self.batch:
+            raise web.HTTPNotFound()
+        await self._async_simulate("query_batch")
+        if self.batch_status is not None:
+            return web.json_response({"error": "batch failed"}, status=self.batch_status)
+        queries = (await request.json())["queries"]
+        return web.json_response(
+            {
+                "results": {
+                    query["token"]: self._payload(query)
+                    for query in queries
+                    if query["token"] not in self.batch_omit
+                }
+            }
+        )
+
+    async def _handle_control(self, request: web.Request) -> web.Response:
+        """Handle a control command."""
+        await self._async_simulate("control")
+        if self.control_status is not None:
+            return web.json_response({"error": "control failed"}, status=self.control_status)
+        body = await request.json()
+        for device in self.account(body["token"]):
+            if device["uid"] == body.get("uid"):
+                break
+        else:
+            raise web.HTTPNotFound()
+        for field in ("interval", "name"):
+            if field in body:
+                device[field] = body[field]
+        if body.get("clean"):
+            device["records"].append({"time": int(time.time()), "reason": "manual"})
+        return web.json_response({"result": "ok"})
+
+    async def _handle_challenge(self, request: web.Request) -> web.Response:
+        """Prove knowledge of the device token for a nonce."""
+        if self.local_token is None:
+            raise web.HTTPNotFound()
+        self.requests["challenge"] += 1
+        nonce = (await request.json())["nonce"]
+        proof = hmac.new(
+            self.local_token.encode(), nonce.encode(), hashlib.sha256
+        ).hexdigest()
+        return web.json_response({"proof": proof})
+
+    async def _handle_push(self, request: web.Request) -> web.WebSocketResponse:
+        """Hold a push subscription open."""
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        token = None
+        try:
+            async for message in websocket:
+                if message.type != web.WSMsgType.TEXT:
+                    continue
+                body = json.loads(message.data)
+                if body.get("action") == "subscribe":
+                    token = body["token"]
+                    self.subscribers.setdefault(token, set()).add(websocket)
+        finally:
+            if token is not None:
+                self.subscribers[token].discard(websocket)
+        return websocket
+
+    def push(self, token: str, message: dict[str, Any] | str | None = None) -> int:
+        """Send ``message`` or the token's payload to its subscribers; thread-safe."""
+        if message is None:
+            message = self._payload({"token": token})
+        text = message if isinstance(message, str) else json.dumps(message)
+
+        async def _send() -> int:
+            sockets = list(self.subscribers.get(token, ()))
+            for websocket in sockets:
+                await websocket.send_str(text)
+            return len(sockets)
+
+        return asyncio.run_coroutine_threadsafe(_send(), self._loop).result()
+
+    def _make_app(self) -> web.Application:
+        """Create the aiohttp application."""
+        app = web.Application()
+        app.router.add_post("/api/querybytoken", self._handle_query)
+        app.router.add_post("/api/querybytokens", self._handle_query_batch)
+        app.router.add_post("/api/control", self._handle_control)
+        app.router.add_post("/api/challenge", self._handle_challenge)
+        app.router.add_get("/api/ws", self._handle_push)
+        return app
+
+    async def async_serve(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on the running loop and return the API base URL."""
+        self._runner = web.AppRunner(self._make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}/api"
+
+    def start(self) -> str:
+        """Serve from a background thread and return the API base URL."""
+        ready = threading.Event()
+        result: dict[str, str] = {}
+
+        def _run() -> None:
+            self._loop = asyncio.new_event_loop()
+            result["url"] = self._loop.run_until_complete(self.async_serve())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name="fake-drumfilter-cloud", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return result["url"]
+
+    def stop(self) -> None:
+        """Stop the background server."""
+        if self._loop is None or self._runner is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+        self._loop = self._runner = self._thread = None
+
+def main() -> None:
+    """Run the fake cloud until interrupted."""
+    parser = argparse.ArgumentParser(description="Fake DrumFilter cloud API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--records", type=int, default=100)
+    parser.add_argument("--no-batch", action="store_true")
+    parser.add_argument("--etag", action="store_true")
+    parser.add_argument("--devices-per-token", type=int, default=1)
+    args = parser.parse_args()
+
+    cloud = FakeDrumFilterCloud(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        record_count=args.records,
+        batch=not args.no_batch,
+        etag=args.etag,
+        devices_per_token=args.devices_per_token,
+    )
+
+    async def _serve() -> None:
+        print("Serving", await cloud.async_serve(port=args.port))
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(_serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
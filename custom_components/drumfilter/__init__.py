@@ -1,54 +1,206 @@
 """The DrumFilter integration."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable, Collection
+from contextlib import nullcontext
+from dataclasses import replace
+from datetime import datetime
+import hashlib
 import logging
+from time import monotonic, time
 from typing import Any
-from datetime import timedelta
 
-import aiohttp
+from aiohttp.hdrs import ETAG, IF_MODIFIED_SINCE, IF_NONE_MATCH, LAST_MODIFIED
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_TOKEN
-from homeassistant.core import HomeAssistant
+from homeassistant.const import ATTR_DEVICE_ID, CONF_HOST, CONF_PORT, CONF_TOKEN
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.helpers import device_registry as dr, discovery
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.json import json_bytes
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads_object
 
-from .const import DOMAIN, API_QUERY, API_CONTROL
+from .const import (
+    DOMAIN,
+    DATA_HUB,
+    DATA_FLEET,
+    EVENT_CLEANED,
+    EVENT_NETWORK_CHANGED,
+    ATTR_UID,
+    ATTR_TIMESTAMP,
+    ATTR_REASON,
+    ATTR_NETWORK,
+    DATA_SEEDS,
+    SEED_MAX_AGE,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    CONF_PUSH,
+    CONF_COMMAND_EXPIRY,
+    DEFAULT_COMMAND_EXPIRY,
+    COMMAND_STORAGE_VERSION,
+    DEFAULT_LOCAL_PORT,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_MAX_POLL_INTERVAL,
+    POLL_BACKOFF_IDLE,
+    POLL_BACKOFF_OFFLINE,
+    POLL_BOOST_DURATION,
+    CLEAN_CHECK_DELAY,
+    OPTIMISTIC_CONFIRM_DELAY,
+    OPTIMISTIC_TIMEOUT,
+    CACHE_STORAGE_VERSION,
+    CACHE_SAVE_DELAY,
+    HISTORY_STORAGE_VERSION,
+    STALE_DATA_TOLERANCE,
+)
+from .breaker import STATE_OPEN, CircuitBreaker
+from .commands import DrumFilterCommandQueue
+from .device import DrumFilterDevice, device_payloads
+from .fleet import DrumFilterFleet
+from .exceptions import DrumFilterCircuitOpenError, DrumFilterError
+from .history import DrumFilterHistory
+from .metrics import DrumFilterMetrics
+from .models import SNAPSHOT_FIELDS, DrumFilterSnapshot
+from .hub import DrumFilterHub
+from .request import RequestCounter, count_requests
+from .transport import TRANSPORT_CLOUD, DrumFilterTransport, async_request
 
 _LOGGER = logging.getLogger(__name__)
 
 # 恢复 text 平台
 PLATFORMS = ["sensor", "number", "scene", "text"]
-DEFAULT_UPDATE_INTERVAL = 10
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the DrumFilter services and the fleet sensors."""
+    from .services import async_setup_services
+
+    await async_setup_services(hass)
+    # 全部设备的汇总传感器不属于任何配置条目，随集成一起加载
+    hass.data.setdefault(DOMAIN, {})[DATA_FLEET] = DrumFilterFleet(hass)
+    hass.async_create_task(
+        discovery.async_load_platform(hass, "sensor", DOMAIN, {}, config)
+    )
+    return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up DrumFilter from a config entry."""
     _LOGGER.debug("Setting up DrumFilter integration")
     
     hass.data.setdefault(DOMAIN, {})
+    hub = hass.data[DOMAIN].get(DATA_HUB)
+    if hub is None:
+        hub = hass.data[DOMAIN][DATA_HUB] = DrumFilterHub(hass)
     
     try:
-        api = DrumFilterAPI(hass, entry.data[CONF_TOKEN])
-        
+        # 刚通过配置流程验证的条目直接沿用验证时的客户端和数据
+        seeded = (api := _async_pop_seed(hass, entry.data[CONF_TOKEN])) is not None
+        if seeded:
+            api.attach_hub(hub)
+        else:
+            api = DrumFilterAPI(hass, entry.data[CONF_TOKEN], hub)
+        # 选项中手动填写的地址优先于 zeroconf 发现的地址
+        if host := entry.options.get(CONF_HOST):
+            api.attach_local(host, DEFAULT_LOCAL_PORT)
+        elif host := entry.data.get(CONF_HOST):
+            api.attach_local(host, entry.data.get(CONF_PORT, DEFAULT_LOCAL_PORT))
         coordinator = DrumFilterDataUpdateCoordinator(
             hass,
             api=api,
-            update_interval=timedelta(seconds=DEFAULT_UPDATE_INTERVAL),
+            storage_key=entry.entry_id,
+            min_interval=entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_POLL_INTERVAL),
+            max_interval=entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_POLL_INTERVAL),
         )
         
-        await coordinator.async_config_entry_first_refresh()
+        store = Store(hass, CACHE_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+        # 配置流程的数据直接作为首次刷新；有缓存时先恢复实体，随后由 hub 立即在后台刷新
+        if seeded:
+            await coordinator.async_seed()
+        elif not (
+            (cached := await store.async_load())
+            and await coordinator.async_restore(cached)
+        ):
+            await coordinator.async_config_entry_first_refresh()
+
+        def _async_save_cache() -> None:
+            store.async_delay_save(coordinator.as_cache, CACHE_SAVE_DELAY)
+
+        # 首次获取的数据也写入缓存，之后只在数据变化时写入；卸载时立即写入，
+        # 重新加载（例如修改选项）时可以直接恢复
+        _async_save_cache()
+        entry.async_on_unload(coordinator.async_add_listener(_async_save_cache))
+        entry.async_on_unload(lambda: store.async_save(coordinator.as_cache()))
         
+        # 每台设备一个命令队列，随设备出现和消失创建或删除
+        commands: dict[str, DrumFilterCommandQueue] = {}
+        expiry = entry.options.get(CONF_COMMAND_EXPIRY, DEFAULT_COMMAND_EXPIRY) * 60
+
+        @callback
+        def _async_sync_devices() -> None:
+            uids = coordinator.data.keys()
+            for uid in uids - commands.keys():
+                commands[uid] = DrumFilterCommandQueue(
+                    hass, coordinator, entry.entry_id, uid, expiry
+                )
+                entry.async_create_task(hass, commands[uid].async_load())
+            if departed := commands.keys() - uids:
+                for uid in departed:
+                    queue = commands.pop(uid)
+                    queue.async_cancel()
+                    entry.async_create_task(hass, queue.async_remove())
+                _async_remove_departed_devices(hass, entry, uids)
+            # 设备恢复在线时重发离线期间保存的命令
+            for queue in commands.values():
+                queue.async_replay()
+
+        async def _async_save_commands() -> None:
+            for queue in commands.values():
+                await queue.async_save()
+
+        _async_sync_devices()
+        _async_remove_departed_devices(hass, entry, coordinator.data.keys())
+        entry.async_on_unload(coordinator.async_add_listener(_async_sync_devices))
+        entry.async_on_unload(_async_save_commands)
+        entry.async_on_unload(
+            hass.data[DOMAIN][DATA_FLEET].async_track_entry(coordinator)
+        )
+
         hass.data[DOMAIN][entry.entry_id] = {
             "api": api,
-            "coordinator": coordinator
+            "coordinator": coordinator,
+            "commands": commands,
         }
+        hub.async_register(entry.entry_id, coordinator)
+        entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+        if entry.options.get(CONF_PUSH, False):
+            # 推送通道是可选功能，按需加载
+            from .push import DrumFilterPushClient
+
+            # 长连接不占用查询连接池
+            push = DrumFilterPushClient(
+                hass, coordinator, async_get_clientsession(hass)
+            )
+            entry.async_create_background_task(
+                hass, push.async_run(), f"{DOMAIN} push {entry.entry_id}"
+            )
 
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
         _LOGGER.info("DrumFilter integration setup completed successfully")
         return True
         
     except Exception as ex:
+        if hub.is_empty:
+            hass.data[DOMAIN].pop(DATA_HUB, None)
+            await hub.async_close()
         _LOGGER.error("Failed to setup DrumFilter integration: %s", ex)
         raise ConfigEntryNotReady(f"Could not connect to DrumFilter API: {ex}") from ex
 
@@ -59,140 +211,807 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        hub = hass.data[DOMAIN][DATA_HUB]
+        hub.async_unregister(entry.entry_id)
+        if hub.is_empty:
+            hass.data[DOMAIN].pop(DATA_HUB)
+            await hub.async_close()
 
     return unload_ok
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached state, history and held commands of a deleted entry."""
+    store = Store(hass, CACHE_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+    cached = await store.async_load() or {}
+    await store.async_remove()
+    for uid in cached.get("devices") or {}:
+        await DrumFilterHistory(hass, f"{entry.entry_id}.{uid}").async_remove()
+        await Store(
+            hass, COMMAND_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.{uid}.commands"
+        ).async_remove()
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Move the stored state of a single-device entry to per-device keys."""
+    if entry.version == 1:
+        store = Store(hass, CACHE_STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+        cached = await store.async_load() or {}
+        uid = (cached.get("snapshot") or {}).get("uid")
+        for suffix, version in (
+            ("history", HISTORY_STORAGE_VERSION),
+            ("commands", COMMAND_STORAGE_VERSION),
+        ):
+            old = Store(hass, version, f"{DOMAIN}.{entry.entry_id}.{suffix}")
+            if (stored := await old.async_load()) is None:
+                continue
+            if uid:
+                await Store(
+                    hass, version, f"{DOMAIN}.{entry.entry_id}.{uid}.{suffix}"
+                ).async_save(stored)
+            else:
+                _LOGGER.warning(
+                    "Device of %s unknown, dropping its stored %s", entry.title, suffix
+                )
+            await old.async_remove()
+        if uid:
+            await store.async_save(
+                {
+                    "devices": {
+                        uid: {"snapshot": cached["snapshot"], "cursor": cached.get("cursor")}
+                    },
+                    "saved_at": cached.get("saved_at"),
+                }
+            )
+        else:
+            await store.async_remove()
+        hass.config_entries.async_update_entry(entry, data={**entry.data}, version=2)
+        _LOGGER.debug("Migrated %s to version 2", entry.title)
+    return True
+
+async def async_remove_config_entry_device(
+    hass: HomeAssistant, entry: ConfigEntry, device_entry: dr.DeviceEntry
+) -> bool:
+    """Allow removing a device that the account no longer reports."""
+    if (data := hass.data.get(DOMAIN, {}).get(entry.entry_id)) is None:
+        # 条目未加载时无法确认设备是否仍在账户中，允许手动删除
+        return True
+    return not any(
+        identifier[0] == DOMAIN and identifier[1] in data["coordinator"].data
+        for identifier in device_entry.identifiers
+    )
+
+@callback
+def _async_remove_departed_devices(
+    hass: HomeAssistant, entry: ConfigEntry, uids: Collection[str]
+) -> None:
+    """Remove devices, and with them their entities, no longer reported."""
+    device_registry = dr.async_get(hass)
+    for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+        if not any(
+            identifier[0] == DOMAIN and identifier[1] in uids
+            for identifier in device.identifiers
+        ):
+            _LOGGER.debug("Removing departed device %s", device.name)
+            device_registry.async_update_device(
+                device.id, remove_config_entry_id=entry.entry_id
+            )
+
+@callback
+def _async_pop_seed(hass: HomeAssistant, token: str) -> DrumFilterAPI | None:
+    """Return the API client validated by the config flow, if still fresh."""
+    seeds = hass.data[DOMAIN].get(DATA_SEEDS, {})
+    if (seed := seeds.pop(token, None)) is None:
+        return None
+    api, validated_at = seed
+    if monotonic() - validated_at > SEED_MAX_AGE:
+        return None
+    return api
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+def _diff_fields(
+    old: DrumFilterSnapshot | None, new: DrumFilterSnapshot
+) -> set[str]:
+    """Return the names of the fields that differ between two snapshots."""
+    if old is None:
+        return set(SNAPSHOT_FIELDS)
+    if new is old:
+        return set()
+    return {
+        field for field in SNAPSHOT_FIELDS if getattr(old, field) != getattr(new, field)
+    }
+
+def _diff_devices(
+    old: dict[str, DrumFilterSnapshot] | None, new: dict[str, DrumFilterSnapshot]
+) -> dict[str, set[str]]:
+    """Return the changed fields of every device whose snapshot differs."""
+    old = old or {}
+    return {
+        uid: fields
+        for uid, snapshot in new.items()
+        if (fields := _diff_fields(old.get(uid), snapshot))
+    }
+
 class DrumFilterDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching DrumFilter data."""
 
-    def __init__(self, hass: HomeAssistant, api, update_interval: timedelta) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api,
+        storage_key: str,
+        min_interval: int,
+        max_interval: int,
+    ) -> None:
         """Initialize."""
         self.api = api
+        self.storage_key = storage_key
+        # 每台设备的本地清洗历史
+        self.histories: dict[str, DrumFilterHistory] = {}
+        # 每个轮询周期发出的上游请求数，正常应恒为 1
+        self.last_cycle_requests = 0
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.poll_interval: float = min_interval
+        # 没有自己的定时器，由共享 hub 在 next_poll 到达时刷新，间隔随设备状态自适应
+        self.next_poll = monotonic() + min_interval
+        self._boost_until = 0.0
+        # 等待清洗记录出现的设备
+        self._awaiting_clean: set[str] = set()
+        self.push_connected = False
+        # 乐观更新：设备 -> 字段 -> (期望值, 开始核对的时间, 截止时间)
+        self._optimistic: dict[str, dict[str, tuple[Any, float, float]]] = {}
+        self._server_data: dict[str, DrumFilterSnapshot] = {}
+        self._server_time = 0.0
+        self.last_success_time: float | None = None
+        # 最近一次更新中每台设备发生变化的字段，实体据此决定是否写入状态
+        self.changed_fields: dict[str, set[str]] = {}
+        # 最早的下次定时清洗 (时间, 设备)，到时只做一次针对性的刷新
+        self._expected_clean: tuple[float, str] | None = None
+        self._unsub_clean: CALLBACK_TYPE | None = None
         super().__init__(
             hass,
             _LOGGER,
             name="DrumFilter",
-            update_interval=update_interval,
+            update_interval=None,
+            # 数据未变化时不通知实体，避免无意义的状态写入
+            always_update=False,
         )
 
+    @property
+    def data_available(self) -> bool:
+        """Return True if the data is current or recent enough to show."""
+        if self.last_update_success:
+            return True
+        return (
+            self.last_success_time is not None
+            and time() - self.last_success_time < STALE_DATA_TOLERANCE
+        )
+
+    async def async_restore(self, cached: dict[str, Any]) -> bool:
+        """Restore cached data and poll right away, False if the cache is unusable."""
+        if (snapshots := self.api.restore(cached)) is None:
+            return False
+        await self._async_sync_devices(snapshots)
+        self.last_success_time = cached.get("saved_at")
+        self._server_data = snapshots
+        self.changed_fields = _diff_devices(self.data, snapshots)
+        self.data = snapshots
+        self.next_poll = monotonic()
+        _LOGGER.debug("Restored cached state for %s device(s)", len(snapshots))
+        return True
+
+    async def async_seed(self) -> None:
+        """Use the data the API client already holds as the first refresh."""
+        snapshots = self.api.snapshots
+        await self._async_sync_devices(snapshots)
+        self._add_records()
+        self.last_success_time = time()
+        self._server_data = snapshots
+        self.changed_fields = _diff_devices(self.data, snapshots)
+        self.data = snapshots
+        self.next_poll = monotonic() + self.poll_interval
+        self._async_track_clean()
+        _LOGGER.debug("Seeded %s device(s) from config flow data", len(snapshots))
+
+    def as_cache(self) -> dict[str, Any]:
+        """Return the data to keep in the on-disk cache."""
+        return {**self.api.as_cache(), "saved_at": self.last_success_time}
+
+    async def _async_sync_devices(self, snapshots: dict[str, DrumFilterSnapshot]) -> None:
+        """Load the history of new devices and delete that of departed ones."""
+        for uid in self.histories.keys() - snapshots.keys():
+            _LOGGER.info("Device %s is no longer reported, removing it", uid)
+            self._optimistic.pop(uid, None)
+            self._awaiting_clean.discard(uid)
+            await self.histories.pop(uid).async_remove()
+
+        if new := snapshots.keys() - self.histories.keys():
+            histories = {
+                uid: DrumFilterHistory(self.hass, f"{self.storage_key}.{uid}")
+                for uid in new
+            }
+            await asyncio.gather(*(history.async_load() for history in histories.values()))
+            self.histories.update(histories)
+
+    def _add_records(self) -> None:
+        """Add the records of the last response to each device's history."""
+        # 首次填充历史时不触发 drumfilter_cleaned 事件，之后每条新记录触发一次
+        for uid, history in self.histories.items():
+            if not (new_records := self.api.devices[uid].new_records):
+                continue
+            baseline = history.last_time is not None
+            added = history.add_records(new_records)
+            if not baseline:
+                continue
+            for record_time, reason in added:
+                self.hass.bus.async_fire(
+                    EVENT_CLEANED,
+                    {
+                        **self._event_data(uid),
+                        ATTR_TIMESTAMP: record_time,
+                        ATTR_REASON: reason,
+                    },
+                )
+
+    def _fire_network_events(self, data: dict[str, DrumFilterSnapshot]) -> None:
+        """Fire ``drumfilter_network_changed`` for devices going on- or offline."""
+        # 须在新数据替换 self.data 之前调用
+        for uid, fields in self.changed_fields.items():
+            if "network" not in fields or (old := (self.data or {}).get(uid)) is None:
+                continue
+            _LOGGER.debug(
+                "Device %s went from %s to %s", uid, old.network, data[uid].network
+            )
+            self.hass.bus.async_fire(
+                EVENT_NETWORK_CHANGED,
+                {**self._event_data(uid), ATTR_NETWORK: data[uid].network},
+            )
+
+    def _event_data(self, uid: str) -> dict[str, Any]:
+        """Return the fields identifying a device in events."""
+        device = dr.async_get(self.hass).async_get_device(identifiers={(DOMAIN, uid)})
+        return {ATTR_DEVICE_ID: device.id if device else None, ATTR_UID: uid}
+
+    async def async_refresh(self) -> None:
+        """Refresh data and mark cached data unavailable once it is too old."""
+        was_available = self.data_available
+        await super().async_refresh()
+        if was_available and not self.data_available:
+            self.async_update_listeners()
+
     async def _async_update_data(self):
         """Fetch data from API."""
-        return await self.api.async_get_data()
+        with count_requests() as requests:
+            return await self._async_poll(requests)
+
+    async def _async_poll(self, requests: RequestCounter) -> dict[str, DrumFilterSnapshot]:
+        """Run one poll cycle, counting its upstream requests."""
+        changed = False
+        self.changed_fields = {}
+        try:
+            snapshots = await self.api.async_get_data()
+            await self._async_sync_devices(snapshots)
+            self._add_records()
+            data = self._reconcile(snapshots)
+            self.changed_fields = _diff_devices(self.data, data)
+            self._fire_network_events(data)
+            changed = bool(self.changed_fields) or len(data) != len(self.data or {})
+            if not changed:
+                self.api.metrics.polls_unchanged += 1
+            self.last_success_time = time()
+            return data
+        except DrumFilterCircuitOpenError as err:
+            self.api.metrics.record_error("circuit_open")
+            raise UpdateFailed(f"Circuit breaker open: {err}") from err
+        except DrumFilterError as err:
+            raise UpdateFailed(str(err)) from err
+        finally:
+            self.last_cycle_requests = requests.count
+            _LOGGER.debug(
+                "Poll cycle for %s device(s) used %s upstream request(s)",
+                len(self.api.devices),
+                self.last_cycle_requests,
+            )
+            self._adapt_interval(changed)
+
+    def _adapt_interval(self, changed: bool) -> None:
+        """Pick the delay until the next poll."""
+        now = monotonic()
+        if self._awaiting_clean:
+            # 清洗记录已出现，结束快速轮询
+            self._awaiting_clean = {
+                uid
+                for uid in self._awaiting_clean
+                if uid in self.api.devices and not self.api.devices[uid].new_records
+            }
+            if not self._awaiting_clean:
+                self._boost_until = 0.0
+
+        if now < self._boost_until:
+            self.poll_interval = self.min_interval
+        elif self.push_connected:
+            self.poll_interval = self.max_interval
+        elif changed:
+            self.poll_interval = self.min_interval
+        elif not any(
+            device.snapshot.network == "online" for device in self.api.devices.values()
+        ):
+            self.poll_interval *= POLL_BACKOFF_OFFLINE
+        else:
+            self.poll_interval *= POLL_BACKOFF_IDLE
+
+        self.poll_interval = min(
+            max(self.poll_interval, self.min_interval), self.max_interval
+        )
+        self.next_poll = now + self.poll_interval
+        self._async_track_clean()
+        if self._optimistic:
+            # 乐观值最迟在截止时间确认或回滚
+            self.next_poll = min(
+                self.next_poll,
+                min(
+                    deadline
+                    for pending in self._optimistic.values()
+                    for _, _, deadline in pending.values()
+                ),
+            )
+
+    def _reconcile(
+        self, snapshots: dict[str, DrumFilterSnapshot], fresh: bool = True
+    ) -> dict[str, DrumFilterSnapshot]:
+        """Overlay pending optimistic values on the server snapshots."""
+        # 服务器返回期望值即确认；确认延时之后的响应仍不一致，或超过截止时间，
+        # 则回退到服务器的值。重新叠加旧数据时只按原响应的时间判断
+        if fresh:
+            self._server_data = snapshots
+            self._server_time = monotonic()
+        if not self._optimistic:
+            return snapshots
+
+        now = monotonic()
+        data = dict(snapshots)
+        for uid, pending in list(self._optimistic.items()):
+            if (snapshot := snapshots.get(uid)) is None:
+                del self._optimistic[uid]
+                continue
+            for field, (value, confirm_at, deadline) in list(pending.items()):
+                if getattr(snapshot, field) == value:
+                    _LOGGER.debug("Confirmed %s=%s on %s", field, value, uid)
+                    del pending[field]
+                elif self._server_time >= confirm_at or now >= deadline:
+                    _LOGGER.warning(
+                        "Device %s did not apply %s=%s, reverting to %s",
+                        uid,
+                        field,
+                        value,
+                        getattr(snapshot, field),
+                    )
+                    del pending[field]
+            if pending:
+                data[uid] = replace(
+                    snapshot,
+                    **{field: value for field, (value, _, _) in pending.items()},
+                )
+            else:
+                del self._optimistic[uid]
+        return data
+
+    @callback
+    def async_set_optimistic(self, uid: str, **fields: Any) -> None:
+        """Show new values right away until the server confirms them."""
+        now = monotonic()
+        pending = self._optimistic.setdefault(uid, {})
+        for field, value in fields.items():
+            pending[field] = (
+                value,
+                now + OPTIMISTIC_CONFIRM_DELAY,
+                now + OPTIMISTIC_TIMEOUT,
+            )
+        if self._server_data:
+            self._async_apply(self._reconcile(self._server_data, fresh=False))
+
+    @callback
+    def async_discard_optimistic(self, uid: str, *fields: str) -> None:
+        """Drop optimistic values after the command failed."""
+        pending = self._optimistic.get(uid, {})
+        for field in fields:
+            pending.pop(field, None)
+        if self._server_data:
+            self._async_apply(self._reconcile(self._server_data, fresh=False))
+
+    @callback
+    def _async_apply(self, data: dict[str, DrumFilterSnapshot]) -> None:
+        """Replace the data and notify listeners if any field changed."""
+        self.changed_fields = _diff_devices(self.data, data)
+        self.data = data
+        if self.changed_fields:
+            self.async_update_listeners()
+
+    @callback
+    def async_request_confirm(self) -> None:
+        """Schedule one targeted refresh to confirm a control command."""
+        self.next_poll = min(self.next_poll, monotonic() + OPTIMISTIC_CONFIRM_DELAY)
+        if self.api.hub is not None:
+            self.api.hub.async_schedule()
+
+    @callback
+    def async_handle_push(self, data: dict[str, Any]) -> None:
+        """Apply a payload received over the push channel."""
+        if not self.api.knows(data):
+            # 新设备需要先加载历史记录，交给一次完整查询处理
+            _LOGGER.debug("Push message for a new device, polling right away")
+            self.next_poll = monotonic()
+            if self.api.hub is not None:
+                self.api.hub.async_schedule()
+            return
+
+        snapshots = self._reconcile(self.api.process_payload(data, complete=False))
+        self._add_records()
+        self.last_success_time = time()
+        self._adapt_interval(False)
+        self.changed_fields = _diff_devices(self.data, snapshots)
+        if self.changed_fields:
+            self._fire_network_events(snapshots)
+            self.async_set_updated_data(snapshots)
+
+    @callback
+    def async_set_push_connected(self, connected: bool) -> None:
+        """Switch between push updates and regular polling."""
+        if connected == self.push_connected:
+            return
+        self.push_connected = connected
+        if connected:
+            _LOGGER.debug("Push channel up, polling only as a consistency check")
+            self._adapt_interval(False)
+            return
+
+        # 推送中断，立即回退到轮询
+        _LOGGER.debug("Push channel down, falling back to polling")
+        self.poll_interval = self.min_interval
+        self.next_poll = monotonic()
+        if self.api.hub is not None:
+            self.api.hub.async_schedule()
+
+    @callback
+    def _async_track_clean(self) -> None:
+        """Schedule a refresh for just after the earliest expected timed clean."""
+        now = time()
+        expected = min(
+            (
+                (next_clean, uid)
+                for uid, device in self.api.devices.items()
+                if (next_clean := device.snapshot.next_clean_time) is not None
+                and next_clean + CLEAN_CHECK_DELAY > now
+            ),
+            default=None,
+        )
+        if expected == self._expected_clean:
+            return
+        self._expected_clean = expected
+        if self._unsub_clean is not None:
+            self._unsub_clean()
+            self._unsub_clean = None
+        if expected is None:
+            return
+        self._unsub_clean = async_track_point_in_time(
+            self.hass,
+            self._async_clean_due,
+            dt_util.utc_from_timestamp(expected[0] + CLEAN_CHECK_DELAY),
+        )
+
+    @callback
+    def _async_clean_due(self, _now: datetime) -> None:
+        """Poll until the expected clean shows up."""
+        self._unsub_clean = None
+        if self._expected_clean is None:
+            return
+        uid = self._expected_clean[1]
+        _LOGGER.debug("Timed clean due for %s", uid)
+        self.async_boost(uid, clean=True)
+
+    async def async_shutdown(self) -> None:
+        """Cancel the clean timer."""
+        await super().async_shutdown()
+        if self._unsub_clean is not None:
+            self._unsub_clean()
+            self._unsub_clean = None
+
+    @callback
+    def async_boost(self, uid: str | None = None, clean: bool = False) -> None:
+        """Poll at the minimum interval after a control command."""
+        # 对 uid 执行清洗后持续快速轮询，直到新记录出现或加速窗口结束
+        now = monotonic()
+        self._boost_until = now + POLL_BOOST_DURATION
+        if clean and uid is not None:
+            self._awaiting_clean.add(uid)
+        self.poll_interval = self.min_interval
+        self.next_poll = min(self.next_poll, now + self.min_interval)
+        if self.api.hub is not None:
+            self.api.hub.async_schedule()
 
 class DrumFilterAPI:
     """API for DrumFilter."""
+    # 一个客户端服务 Token 绑定的全部设备，一次查询返回所有设备，按 uid 存于 devices
     
-    def __init__(self, hass: HomeAssistant, token: str) -> None:
+    def __init__(
+        self, hass: HomeAssistant, token: str, hub: DrumFilterHub | None = None
+    ) -> None:
         """Initialize the API."""
         self.hass = hass
         self.token = token
-        self.websession = async_get_clientsession(hass)
-        self.data = {}
-        self.device_info = {
-            "name": "Unknown",
-            "interval": 0,
-            "network": "unknown",
-            "uid": "unknown",
-            "model": "DrumFilter",
-            "last_record": None,
-            "total_records": 0
-        }
+        self.hub = hub
+        self.websession = (
+            hub.websession if hub is not None else async_get_clientsession(hass)
+        )
+        # 同一云端的所有设备共用 hub 上的熔断器
+        self.breaker = hub.breaker if hub is not None else CircuitBreaker()
+        self.cloud = DrumFilterTransport.cloud(self.websession, self.breaker)
+        # 局域网可达时优先直连设备，失败自动回退到云端
+        self.local: DrumFilterTransport | None = None
+        self.last_transport = TRANSPORT_CLOUD
+        self._transport_listeners: dict[CALLBACK_TYPE, None] = {}
+        self.metrics = DrumFilterMetrics()
+        self.devices: dict[str, DrumFilterDevice] = {}
+        # 上次响应的校验头和响应体摘要
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+        self._body_hash: bytes | None = None
+
+    def attach_hub(self, hub: DrumFilterHub) -> None:
+        """Move a standalone client onto the shared hub."""
+        self.hub = hub
+        self.websession = hub.websession
+        self.breaker = hub.breaker
+        self.cloud = DrumFilterTransport.cloud(self.websession, self.breaker)
+
+    def attach_local(self, host: str, port: int) -> None:
+        """Talk to the device directly on the local network when possible."""
+        _LOGGER.debug("Using local transport at %s:%s", host, port)
+        self.local = DrumFilterTransport.local(self.websession, host, port)
+
+    @callback
+    def async_add_transport_listener(
+        self, update_callback: CALLBACK_TYPE
+    ) -> Callable[[], None]:
+        """Call ``update_callback`` when requests move to another transport."""
+        self._transport_listeners[update_callback] = None
+
+        @callback
+        def remove_listener() -> None:
+            self._transport_listeners.pop(update_callback, None)
+
+        return remove_listener
+
+    def _set_transport(self, name: str) -> None:
+        """Record the transport of the last request."""
+        if name == self.last_transport:
+            return
+        self.last_transport = name
+        for update_callback in list(self._transport_listeners):
+            update_callback()
+
+    @property
+    def transports(self) -> list[DrumFilterTransport]:
+        """Return the transports to try, in order."""
+        # 本地接口只认识设备自己，多设备的 Token 总是走云端
+        if self.local is None or len(self.devices) > 1:
+            return [self.cloud]
+        return [self.local, self.cloud]
 
     @property
-    def device_identifier(self) -> str:
-        """Return device unique identifier."""
-        return self.device_info.get("uid", "unknown")
-
-    def get_device_info(self) -> DeviceInfo:
-        """Get Home Assistant device info."""
-        return DeviceInfo(
-            identifiers={(DOMAIN, self.device_identifier)},
-            name=self.device_info.get("name", "DrumFilter"),
-            manufacturer="DrumFilter",
-            model=self.device_info.get("model", "DrumFilter"),
+    def local_available(self) -> bool:
+        """Return True if the next request will try the local transport."""
+        if self.local is None or len(self.devices) > 1:
+            return False
+        breaker = self.local.breaker
+        return breaker.state != STATE_OPEN or not breaker.retry_in
+
+    @property
+    def snapshots(self) -> dict[str, DrumFilterSnapshot]:
+        """Return the current snapshot of every device."""
+        return {uid: device.snapshot for uid, device in self.devices.items()}
+
+    def as_cache(self) -> dict[str, Any]:
+        """Return the device state worth keeping across restarts."""
+        return {
+            "devices": {uid: device.as_cache() for uid, device in self.devices.items()}
+        }
+
+    def restore(self, cached: dict[str, Any]) -> dict[str, DrumFilterSnapshot] | None:
+        """Restore cached device state and return the snapshots."""
+        try:
+            devices = {
+                uid: device
+                for uid, data in (cached.get("devices") or {}).items()
+                if (device := DrumFilterDevice.from_cache(uid, data)) is not None
+            }
+        except DrumFilterError as err:
+            _LOGGER.warning("Ignoring unreadable cached state: %s", err)
+            return None
+        if not devices:
+            return None
+        self.devices = devices
+        return self.snapshots
+
+    def query_payload(self) -> dict[str, Any]:
+        """Return the query body for this token."""
+        # 游标取所有设备中最旧的，各设备自行丢弃已有的记录
+        payload: dict[str, Any] = {"token": self.token}
+        cursors = [
+            device.records_cursor
+            for device in self.devices.values()
+            if device.records_cursor is not None
+        ]
+        if cursors:
+            payload["since"] = min(cursors)
+        return payload
+
+    def knows(self, data: dict[str, Any]) -> bool:
+        """Return True if every device in a payload is already known."""
+        return all(
+            payload.get("uid") in self.devices for payload in device_payloads(data)
         )
 
-    async def async_get_data(self) -> dict[str, Any]:
+    async def async_get_data(self) -> dict[str, DrumFilterSnapshot]:
         """Get data from the API."""
         _LOGGER.debug("Fetching data from API")
         
         try:
-            timeout = aiohttp.ClientTimeout(total=10)
-            response = await self.websession.post(
-                API_QUERY,
-                json={"token": self.token},
-                headers={"Content-Type": "application/json"},
-                timeout=timeout
-            )
-            
-            if response.status != 200:
-                raise Exception(f"HTTP error: {response.status}")
-                
-            data = await response.json()
-            
-            records = data.get("records", [])
-            last_record = records[-1] if records else None
-            
-            self.device_info.update({
-                "name": data.get("name", "DrumFilter"),
-                "interval": data.get("interval", 10),
-                "network": data.get("network", "offline"),
-                "uid": data.get("uid", ""),
-                "model": data.get("model", "DrumFilter"),
-                "last_record": last_record,
-                "total_records": len(records)
-            })
-            
-            self.data = data
-            return data
-            
-        except aiohttp.ClientError as err:
-            _LOGGER.error("Network error fetching data: %s", err)
-            raise
-        except Exception as err:
-            _LOGGER.error("Error fetching data: %s", err)
+            # 本地直连的设备不参与云端批量查询
+            if self.hub is not None and not self.local_available:
+                data = await self.hub.async_query(self)
+            else:
+                data = await self.async_fetch_payload()
+            if data is not None:
+                return self.process_payload(data)
+        except DrumFilterError:
+            # 被拒绝的响应不能在下次被当作“未变化”
+            self._body_hash = self._etag = self._last_modified = None
             raise
 
-    async def async_control_device(self, interval: int | None = None, clean: bool = False, name: str | None = None) -> bool:
-        """Send control command to device."""
-        _LOGGER.debug("Sending control command: interval=%s, clean=%s, name=%s", interval, clean, name)
-        
+        # 响应未变化时返回原快照，协调器不会看到变化
+        for device in self.devices.values():
+            device.new_records = []
+        # 未变化的响应同样不包含上次缺失的设备
+        self.devices = {
+            uid: device
+            for uid, device in self.devices.items()
+            if not (device.missed_polls and device.mark_missing())
+        }
+        return self.snapshots
+
+    def process_payload(
+        self, data: dict[str, Any], complete: bool = True
+    ) -> dict[str, DrumFilterSnapshot]:
+        """Apply a decoded query payload and return the new snapshots."""
+        # complete 表示响应列出了该 Token 的全部设备，推送等部分消息不影响其他设备
+        payloads = [
+            payload for payload in device_payloads(data) if payload.get("uid")
+        ]
+        if complete and not payloads:
+            # 错误或截断的响应不能当作全部设备已解绑
+            raise DrumFilterError("Response lists no devices")
+
+        devices: dict[str, DrumFilterDevice] = {}
+        saved = {uid: device.as_state() for uid, device in self.devices.items()}
+        for device in self.devices.values():
+            device.new_records = []
         try:
-            uid = self.device_info.get("uid")
-            if not uid:
-                _LOGGER.error("No UID available for control command")
-                return False
-                
-            payload = {
-                "token": self.token,
-                "uid": uid
-            }
-            
-            if interval is not None:
-                payload["interval"] = interval
-            if clean:
-                payload["clean"] = "true"
-            if name is not None:
-                payload["name"] = name
-            
-            timeout = aiohttp.ClientTimeout(total=10)
-            response = await self.websession.post(
-                API_CONTROL,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=timeout
+            for payload in payloads:
+                uid = payload["uid"]
+                device = self.devices.get(uid) or DrumFilterDevice(uid)
+                device.process_payload(payload)
+                devices[uid] = device
+        except (AttributeError, KeyError, TypeError, ValueError) as err:
+            # 格式错误的响应不留下处理了一半的设备状态
+            for uid, state in saved.items():
+                self.devices[uid].load_state(state)
+            self.metrics.record_error("invalid_payload")
+            raise DrumFilterError(f"Malformed response from API: {err!r}") from err
+        for uid, device in self.devices.items():
+            if uid not in devices and not (complete and device.mark_missing()):
+                devices[uid] = device
+        self.devices = devices
+        return self.snapshots
+
+    async def async_fetch_payload(self) -> dict[str, Any] | None:
+        """Query this token on its own, None if the payload is unchanged."""
+        # 回传上次响应的 ETag / Last-Modified，304 或正文相同时不再解码
+        headers: dict[str, str] = {}
+        if self._etag is not None:
+            headers[IF_NONE_MATCH] = self._etag
+        if self._last_modified is not None:
+            headers[IF_MODIFIED_SINCE] = self._last_modified
+
+        transport, (status, body, response_headers) = await async_request(
+            self.transports, "async_query", self.query_payload(), self.metrics, headers
+        )
+        self._set_transport(transport.name)
+
+        if status == 304:
+            self.metrics.not_modified += 1
+            _LOGGER.debug("Payload not modified")
+            return None
+
+        if status != 200:
+            self.metrics.record_error(f"http_{status}")
+            raise DrumFilterError(f"HTTP error: {status}")
+
+        # 服务器不支持条件请求时，比较原始字节的摘要
+        body_hash = hashlib.sha1(body).digest()
+        if body_hash == self._body_hash:
+            _LOGGER.debug("Payload unchanged, skipping decode")
+            data = None
+        else:
+            start = monotonic()
+            try:
+                data = json_loads_object(body)
+            except ValueError as err:
+                self.metrics.record_error("invalid_json")
+                raise DrumFilterError(f"Invalid response from API: {err}") from err
+            self.metrics.record_decode(monotonic() - start)
+            self._body_hash = body_hash
+
+        # 只有成功处理的响应才记录校验头，避免 304 掩盖解析失败的数据
+        self._etag = response_headers.get(ETAG)
+        self._last_modified = response_headers.get(LAST_MODIFIED)
+        return data
+
+    def batch_payload(self, data: dict[str, Any]) -> dict[str, Any] | None:
+        """Return this token's result from a batch, or None if it is unchanged."""
+        # 批量结果没有 ETag，按序列化后的摘要判断是否变化
+        body_hash = hashlib.sha1(json_bytes(data)).digest()
+        if body_hash == self._body_hash:
+            _LOGGER.debug("Batched payload unchanged, skipping processing")
+            return None
+        self._body_hash = body_hash
+        return data
+
+    async def async_send_command(
+        self,
+        uid: str,
+        interval: int | None = None,
+        clean: bool = False,
+        name: str | None = None,
+    ) -> None:
+        """Send a control command to one device, raising DrumFilterError on failure."""
+        _LOGGER.debug(
+            "Sending control command to %s: interval=%s, clean=%s, name=%s",
+            uid,
+            interval,
+            clean,
+            name,
+        )
+
+        if uid not in self.devices:
+            raise DrumFilterError(f"Unknown device {uid}")
+
+        payload = {
+            "token": self.token,
+            "uid": uid
+        }
+
+        if interval is not None:
+            payload["interval"] = interval
+        if clean:
+            payload["clean"] = "true"
+        if name is not None:
+            payload["name"] = name
+
+        # 清洗命令超时后不经其他传输方式重发，避免设备清洗两次
+        semaphore = self.hub.command_semaphore if self.hub is not None else nullcontext()
+        async with semaphore:
+            transport, status = await async_request(
+                self.transports,
+                "async_control",
+                payload,
+                self.metrics,
+                fallback_on_timeout=not clean,
             )
-            
-            if response.status != 200:
-                _LOGGER.error("Control API returned error: %s", response.status)
-                return False
-                
-            await response.json()
-            return True
-            
-        except aiohttp.ClientError as err:
-            _LOGGER.error("Network error controlling device: %s", err)
-            return False
-        except Exception as err:
-            _LOGGER.error("Error controlling device: %s", err)
-            return False
\ No newline at end of file
+        self._set_transport(transport.name)
+
+        if status != 200:
+            self.metrics.record_error(f"http_{status}")
+            raise DrumFilterError(f"Control API returned error: {status}")
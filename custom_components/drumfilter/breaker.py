@@ -0,0 +1,117 @@
+"""Circuit breaker guarding the DrumFilter cloud API."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+import random
+from time import monotonic
+from typing import Any
+
+from .const import (
+    BREAKER_BASE_COOLDOWN,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_MAX_COOLDOWN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Stop calling the cloud after repeated failures."""
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        base_cooldown: float = BREAKER_BASE_COOLDOWN,
+        max_cooldown: float = BREAKER_MAX_COOLDOWN,
+        name: str = "DrumFilter cloud API",
+    ) -> None:
+        """Initialize the breaker."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.trips = 0
+        # 每次断开冷却时间翻倍并加抖动，冷却结束后只放行一个探测请求（半开）
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._listeners: dict[Callable[[], None], None] = {}
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds left until the next probe is allowed."""
+        return max(self._open_until - monotonic(), 0.0)
+
+    def add_listener(self, state_callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``state_callback`` whenever the breaker changes state."""
+        self._listeners[state_callback] = None
+
+        def remove_listener() -> None:
+            self._listeners.pop(state_callback, None)
+
+        return remove_listener
+
+    def _set_state(self, state: str) -> None:
+        """Change the state and notify the listeners."""
+        if state == self.state:
+            return
+        self.state = state
+        for state_callback in list(self._listeners):
+            state_callback()
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN:
+            if monotonic() < self._open_until:
+                return False
+            _LOGGER.debug("Circuit half-open, sending probe request")
+            self._probe_in_flight = False
+            self._set_state(STATE_HALF_OPEN)
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful request."""
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("%s recovered, circuit closed", self.name)
+        self.failures = 0
+        self.trips = 0
+        self._probe_in_flight = False
+        self._set_state(STATE_CLOSED)
+
+    def record_failure(self) -> None:
+        """Count a failure and open the breaker if needed."""
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            self._trip()
+
+    def _trip(self) -> None:
+        """Open the breaker with an exponential, jittered cooldown."""
+        self.trips += 1
+        cooldown = min(self.base_cooldown * 2 ** (self.trips - 1), self.max_cooldown)
+        cooldown *= random.uniform(0.8, 1.2)
+        self._open_until = monotonic() + cooldown
+        if self.state == STATE_CLOSED:
+            _LOGGER.warning(
+                "%s failing, pausing requests for %.0fs", self.name, cooldown
+            )
+        self._set_state(STATE_OPEN)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the breaker state for diagnostics."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": round(self.retry_in, 1),
+        }
@@ -0,0 +1,257 @@
+"""Control command queue for the DrumFilter integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from enum import StrEnum
+from time import monotonic, time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    COMMAND_DEBOUNCE,
+    COMMAND_MAX_DELAY,
+    COMMAND_SAVE_DELAY,
+    COMMAND_STORAGE_VERSION,
+    DOMAIN,
+)
+from .exceptions import (
+    DrumFilterConnectionError,
+    DrumFilterError,
+    DrumFilterTimeoutError,
+)
+
+if TYPE_CHECKING:
+    from . import DrumFilterDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+class CommandResult(StrEnum):
+    """Outcome of a queued control command."""
+
+    SENT = "sent"
+    QUEUED = "queued"
+    FAILED = "failed"
+
+class DrumFilterCommandQueue:
+    """Debounce, merge and, while the device is unreachable, hold control commands."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: DrumFilterDataUpdateCoordinator,
+        entry_id: str,
+        uid: str,
+        expiry: float,
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.api = coordinator.api
+        self.uid = uid
+        self.expiry = expiry
+        self._store: Store = Store(
+            hass, COMMAND_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.{uid}.commands"
+        )
+        # 防抖期间合并的字段，最多延迟 COMMAND_MAX_DELAY 秒发送
+        self._pending: dict[str, Any] = {}
+        self._future: asyncio.Future[CommandResult] | None = None
+        self._first_queued = 0.0
+        self._unsub_flush: CALLBACK_TYPE | None = None
+        # 离线时保存的命令：字段 -> [值, 加入时间]，恢复在线后只重发一次
+        self.held: dict[str, list[Any]] = {}
+        self._replaying = False
+
+    @property
+    def reachable(self) -> bool:
+        """Return True if commands can be sent right now."""
+        snapshot = (self.coordinator.data or {}).get(self.uid)
+        return (
+            self.coordinator.last_update_success
+            and snapshot is not None
+            and snapshot.network == "online"
+        )
+
+    async def async_load(self) -> None:
+        """Load the commands held before a restart and replay them if possible."""
+        if stored := await self._store.async_load():
+            # 加载期间新保存的命令优先
+            self.held = {**stored.get("held", {}), **self.held}
+            self._drop_expired()
+        self.async_replay()
+
+    async def async_save(self) -> None:
+        """Write the held commands to disk right away."""
+        await self._store.async_save(self._data_to_save())
+
+    async def async_remove(self) -> None:
+        """Delete the stored commands."""
+        await self._store.async_remove()
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop the pending command of a device that has left the account."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        self._pending = {}
+        if (future := self._future) is not None:
+            self._future = None
+            future.set_result(CommandResult.FAILED)
+
+    async def async_send(
+        self,
+        interval: int | None = None,
+        clean: bool = False,
+        name: str | None = None,
+    ) -> CommandResult:
+        """Queue a command and wait for the merged request to finish."""
+        if interval is not None:
+            self._pending["interval"] = interval
+        if name is not None:
+            self._pending["name"] = name
+        if clean:
+            self._pending["clean"] = True
+
+        now = monotonic()
+        if self._future is None:
+            self._future = self.hass.loop.create_future()
+            self._first_queued = now
+        else:
+            self.api.metrics.coalesced += 1
+        future = self._future
+
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+        delay = min(COMMAND_DEBOUNCE, self._first_queued + COMMAND_MAX_DELAY - now)
+        self._unsub_flush = async_call_later(self.hass, max(delay, 0), self._async_flush)
+
+        return await asyncio.shield(future)
+
+    @callback
+    def async_replay(self) -> None:
+        """Replay held commands if the device is reachable again."""
+        if not self.held or self._replaying or not self.reachable:
+            return
+        self._replaying = True
+        self.hass.async_create_task(self._async_replay())
+
+    async def _async_replay(self) -> None:
+        """Send the held commands once."""
+        try:
+            if not self._drop_expired():
+                return
+            fields = {field: value for field, (value, _) in self.held.items()}
+            _LOGGER.info(
+                "Device %s is reachable again, replaying held command: %s",
+                self.uid,
+                fields,
+            )
+            # 不带新字段发送，刷新时只合并保存的命令
+            result = await self.async_send()
+        finally:
+            self._replaying = False
+
+        if result is CommandResult.SENT:
+            if fields.get("clean"):
+                self.coordinator.async_boost(self.uid, clean=True)
+            else:
+                self.coordinator.async_request_confirm()
+        elif result is CommandResult.FAILED:
+            snapshot = (self.coordinator.data or {}).get(self.uid)
+            name = snapshot.name if snapshot is not None else self.uid
+            persistent_notification.async_create(
+                self.hass,
+                f"{name} 恢复在线后重发离线期间保存的命令失败，命令已丢弃：{fields}",
+                title="DrumFilter",
+                notification_id=f"{DOMAIN}_{self.uid}_replay_failed",
+            )
+
+    async def _async_flush(self, _now: datetime) -> None:
+        """Send the merged command together with any held one."""
+        self._unsub_flush = None
+        fresh, self._pending = self._pending, {}
+        future, self._future = self._future, None
+        if future is None:
+            return
+
+        pending = fresh
+        if self.held:
+            # 保存的旧命令与新命令合并，新值优先
+            self._drop_expired()
+            pending = {
+                **{field: value for field, (value, _) in self.held.items()},
+                **fresh,
+            }
+
+        if not self.reachable and self.expiry:
+            future.set_result(self._hold(pending))
+            return
+
+        if self.held:
+            # 保存的命令只重发一次，无论结果如何都不再保留
+            self.held = {}
+            self._store.async_delay_save(self._data_to_save, COMMAND_SAVE_DELAY)
+
+        _LOGGER.debug("Sending merged control command: %s", pending)
+        try:
+            await self.api.async_send_command(self.uid, **pending)
+        except DrumFilterConnectionError as err:
+            _LOGGER.debug("Control command failed: %s", err)
+            if isinstance(err, DrumFilterTimeoutError) and fresh.pop("clean", False):
+                # 超时的清洗命令可能已被执行，不保存重发
+                _LOGGER.warning(
+                    "Clean command for %s timed out and may have been applied, "
+                    "not sending it again",
+                    self.uid,
+                )
+            if self.expiry and fresh:
+                # 只有调用方这次发出的新命令继续保存
+                future.set_result(self._hold(fresh))
+            else:
+                future.set_result(CommandResult.FAILED)
+        except DrumFilterError as err:
+            _LOGGER.error("Error controlling device: %s", err)
+            future.set_result(CommandResult.FAILED)
+        except Exception as err:  # pylint: disable=broad-except
+            future.set_exception(err)
+        else:
+            future.set_result(CommandResult.SENT)
+
+    def _hold(self, fields: dict[str, Any]) -> CommandResult:
+        """Keep a command until the device is reachable again."""
+        now = time()
+        for field, value in fields.items():
+            if self.held.get(field, [None])[0] != value:
+                self.held[field] = [value, now]
+        self._store.async_delay_save(self._data_to_save, COMMAND_SAVE_DELAY)
+        _LOGGER.info(
+            "Device %s unreachable, holding command until it is back: %s",
+            self.uid,
+            fields,
+        )
+        return CommandResult.QUEUED
+
+    def _drop_expired(self) -> bool:
+        """Discard held fields older than the expiry, return True if any remain."""
+        cutoff = time() - self.expiry
+        for field, (value, queued_at) in list(self.held.items()):
+            if queued_at < cutoff:
+                _LOGGER.warning(
+                    "Dropping expired command %s=%s for %s",
+                    field,
+                    value,
+                    self.uid,
+                )
+                del self.held[field]
+                self._store.async_delay_save(self._data_to_save, COMMAND_SAVE_DELAY)
+        return bool(self.held)
+
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {"held": self.held}
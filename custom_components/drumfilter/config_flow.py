@@ -2,18 +2,39 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+from time import monotonic
+from typing import TYPE_CHECKING, Any
 
-import aiohttp
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.const import CONF_TOKEN
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_TOKEN
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import DOMAIN
+from . import DrumFilterAPI
+from .const import (
+    DOMAIN,
+    DATA_SEEDS,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    CONF_PUSH,
+    CONF_COMMAND_EXPIRY,
+    DEFAULT_COMMAND_EXPIRY,
+    MAX_COMMAND_EXPIRY,
+    DEFAULT_LOCAL_PORT,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_MAX_POLL_INTERVAL,
+    MIN_POLL_INTERVAL,
+    MAX_POLL_INTERVAL,
+)
+from .exceptions import DrumFilterConnectionError, DrumFilterError
+from .transport import DrumFilterTransport
+
+if TYPE_CHECKING:
+    from homeassistant.components.zeroconf import ZeroconfServiceInfo
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,41 +44,62 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+class CannotConnect(HomeAssistantError):
+    """Error to indicate we cannot reach the DrumFilter API."""
+
+class InvalidToken(HomeAssistantError):
+    """Error to indicate the token was rejected."""
+
+class NoDevices(HomeAssistantError):
+    """Error to indicate the token has no devices bound."""
+
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
-    
-    websession = async_get_clientsession(hass)
+    # 返回验证过的 API 客户端，初始化时复用其响应而不再次查询
+    api = DrumFilterAPI(hass, data[CONF_TOKEN])
     
     try:
-        timeout = aiohttp.ClientTimeout(total=10)
-        response = await websession.post(
-            "https://cuzcanon.cn/api/querybytoken",
-            json={"token": data[CONF_TOKEN]},
-            headers={"Content-Type": "application/json"},
-            timeout=timeout
-        )
-        
-        if response.status != 200:
-            raise Exception(f"HTTP error: {response.status}")
-            
-        result = await response.json()
-        
-        # 更宽松的验证，只要有响应就认为有效
-        if not result:
-            raise Exception("Empty response from API")
-            
-        device_name = result.get("name", "DrumFilter")
-        return {"title": device_name}
-        
-    except aiohttp.ClientError as err:
-        raise Exception(f"Cannot connect to DrumFilter API: {err}")
-    except Exception as err:
-        raise Exception(f"Invalid token or API error: {err}")
+        result = await api.async_fetch_payload()
+    except DrumFilterConnectionError as err:
+        raise CannotConnect(f"Cannot connect to DrumFilter API: {err}") from err
+    except DrumFilterError as err:
+        raise InvalidToken(f"Invalid token or API error: {err}") from err
+
+    # 更宽松的验证，只要有响应就认为有效
+    if not result:
+        raise InvalidToken("Invalid token or API error: Empty response from API")
+
+    try:
+        snapshots = api.process_payload(result)
+    except DrumFilterError as err:
+        raise NoDevices("No devices found for this token") from err
+
+    if len(snapshots) == 1:
+        title = next(iter(snapshots.values())).name
+    else:
+        title = f"DrumFilter（{len(snapshots)} 台设备）"
+    return {"title": title, "api": api}
 
 class DrumFilterConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for DrumFilter."""
 
-    VERSION = 1
+    # 版本 2：一个 Token 下可以有多台设备
+    VERSION = 2
+
+    def __init__(self) -> None:
+        """Initialize the config flow."""
+        # zeroconf 发现的设备地址，验证通过后才保存到条目
+        self._discovered: dict[str, Any] = {}
+        self._entry: config_entries.ConfigEntry | None = None
+        self._seed: tuple[DrumFilterAPI, float] | None = None
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> DrumFilterOptionsFlow:
+        """Get the options flow for this handler."""
+        return DrumFilterOptionsFlow(config_entry)
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -68,20 +110,165 @@ class DrumFilterConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             try:
                 info = await validate_input(self.hass, user_input)
-                
+            except CannotConnect:
+                errors["base"] = "cannot_connect"
+            except InvalidToken:
+                errors["base"] = "invalid_token"
+            except NoDevices:
+                errors["base"] = "no_devices"
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Unexpected error validating the token")
+                errors["base"] = "unknown"
+            else:
                 await self.async_set_unique_id(user_input[CONF_TOKEN])
                 self._abort_if_unique_id_configured()
+
+                if self._discovered and not await self._async_verify_local(
+                    user_input[CONF_TOKEN]
+                ):
+                    # 地址未通过验证时只使用云端
+                    self._discovered = {}
+
+                self._seed = (info["api"], monotonic())
+                self.hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SEEDS, {})[
+                    user_input[CONF_TOKEN]
+                ] = self._seed
                 
                 return self.async_create_entry(
                     title=info["title"], 
-                    data=user_input
+                    data={**user_input, **self._discovered}
                 )
-                
-            except Exception as err:
-                errors["base"] = str(err)
 
         return self.async_show_form(
             step_id="user", 
             data_schema=STEP_USER_DATA_SCHEMA, 
             errors=errors
-        )
\ No newline at end of file
+        )
+
+    @callback
+    def async_remove(self) -> None:
+        """Drop the validated client if setup did not pick it up."""
+        # 条目初始化在流程结束前完成，剩下的客户端不会再被使用
+        seeds = self.hass.data.get(DOMAIN, {}).get(DATA_SEEDS, {})
+        if self._seed is not None and seeds.get(self.unique_id) is self._seed:
+            del seeds[self.unique_id]
+
+    async def async_step_zeroconf(
+        self, discovery_info: ZeroconfServiceInfo
+    ) -> FlowResult:
+        """Handle a device announcing its local API."""
+        # 广播未经认证，地址须经用户确认且设备通过 Token 质询后才使用
+        if not (uid := discovery_info.properties.get("uid")):
+            return self.async_abort(reason="not_drumfilter_device")
+        address = {
+            CONF_HOST: discovery_info.host,
+            CONF_PORT: discovery_info.port or DEFAULT_LOCAL_PORT,
+        }
+        _LOGGER.debug("Discovered DrumFilter %s at %s", uid, address)
+
+        # 同一设备的重复发现只保留一个流程，输入 Token 后改用 Token 作为唯一 ID
+        await self.async_set_unique_id(uid)
+        self._discovered = address
+        self.context["title_placeholders"] = {
+            "name": uid,
+            "host": discovery_info.host,
+        }
+
+        for entry in self._async_current_entries():
+            runtime = self.hass.data.get(DOMAIN, {}).get(entry.entry_id)
+            if runtime is not None and uid in runtime["api"].devices:
+                if all(entry.data.get(key) == value for key, value in address.items()):
+                    return self.async_abort(reason="already_configured")
+                self._entry = entry
+                return await self.async_step_confirm_host()
+
+        return await self.async_step_user()
+
+    async def async_step_confirm_host(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Ask before moving a configured device to a discovered address."""
+        entry = self._entry
+        if user_input is None:
+            return self.async_show_form(
+                step_id="confirm_host",
+                description_placeholders={
+                    "name": entry.title,
+                    "host": self._discovered[CONF_HOST],
+                    "old_host": entry.data.get(CONF_HOST, "-"),
+                },
+            )
+
+        if not await self._async_verify_local(entry.data[CONF_TOKEN]):
+            return self.async_abort(reason="local_verification_failed")
+        # 更新条目数据会重新加载条目
+        self.hass.config_entries.async_update_entry(
+            entry, data={**entry.data, **self._discovered}
+        )
+        return self.async_abort(reason="host_updated")
+
+    async def _async_verify_local(self, token: str) -> bool:
+        """Return True if the discovered device knows ``token``."""
+        transport = DrumFilterTransport.local(
+            async_get_clientsession(self.hass),
+            self._discovered[CONF_HOST],
+            self._discovered[CONF_PORT],
+        )
+        try:
+            await transport.async_verify(token)
+        except DrumFilterConnectionError:
+            return False
+        return True
+
+class DrumFilterOptionsFlow(config_entries.OptionsFlow):
+    """Handle DrumFilter options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage polling, push, offline commands and the local address."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            if user_input[CONF_MIN_INTERVAL] > user_input[CONF_MAX_INTERVAL]:
+                errors["base"] = "min_above_max"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        interval_range = vol.All(
+            vol.Coerce(int), vol.Range(min=MIN_POLL_INTERVAL, max=MAX_POLL_INTERVAL)
+        )
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_MIN_INTERVAL,
+                    default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_POLL_INTERVAL),
+                ): interval_range,
+                vol.Required(
+                    CONF_MAX_INTERVAL,
+                    default=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_POLL_INTERVAL),
+                ): interval_range,
+                vol.Required(
+                    CONF_PUSH, default=options.get(CONF_PUSH, False)
+                ): bool,
+                vol.Required(
+                    CONF_COMMAND_EXPIRY,
+                    default=options.get(CONF_COMMAND_EXPIRY, DEFAULT_COMMAND_EXPIRY),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=MAX_COMMAND_EXPIRY)),
+                vol.Optional(
+                    CONF_HOST,
+                    description={"suggested_value": options.get(CONF_HOST)},
+                ): str,
+            }
+        )
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=schema,
+            errors=errors
+        )
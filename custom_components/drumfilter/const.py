@@ -6,6 +6,46 @@ CONF_TOKEN = "token"
 API_BASE_URL = "https://cuzcanon.cn/api"
 API_QUERY = f"{API_BASE_URL}/querybytoken"
 API_CONTROL = f"{API_BASE_URL}/control"
+# 推送通道与 REST 接口同源，只把协议换成 WebSocket
+API_PUSH = f"ws{API_BASE_URL.removeprefix('http')}/ws"
+# 批量查询接口，服务器不支持时自动回退为单设备查询
+API_QUERY_BATCH = f"{API_BASE_URL}/querybytokens"
+# 批量接口不可用后多久重新尝试（秒）
+BATCH_REPROBE_INTERVAL = 3600
+
+# hass.data[DOMAIN] 中共享调度器的键
+DATA_HUB = "hub"
+# hass.data[DOMAIN] 中全部设备汇总索引的键
+DATA_FLEET = "fleet"
+# hass.data[DOMAIN] 中正在运行的性能分析
+DATA_PROFILER = "profiler"
+# hass.data[DOMAIN] 中配置流程验证过的 API 客户端，供随后的初始化直接使用
+DATA_SEEDS = "seeds"
+SEED_MAX_AGE = 60
+
+# 单设备查询的最大并发数
+MAX_CONCURRENT_QUERIES = 8
+# 同时发出的控制命令数上限，命令队列合并等待期间不占用名额
+COMMAND_MAX_CONCURRENCY = 20
+
+# 自适应轮询（秒）
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+DEFAULT_MIN_POLL_INTERVAL = 10
+DEFAULT_MAX_POLL_INTERVAL = 600
+MIN_POLL_INTERVAL = 5
+MAX_POLL_INTERVAL = 86400
+# 数据无变化 / 设备离线时每次轮询间隔的放大倍数
+POLL_BACKOFF_IDLE = 1.5
+POLL_BACKOFF_OFFLINE = 2
+# 控制命令后以最小间隔轮询的时长
+POLL_BOOST_DURATION = 120
+# 相差不超过该秒数的到期设备合并到同一次轮询
+POLL_ALIGN_WINDOW = 2
+# 一轮轮询的最长时间，超时的刷新被取消，避免卡住共享的定时器
+POLL_TICK_TIMEOUT = 60
+# 预计的定时清洗时间过后多久开始确认刷新
+CLEAN_CHECK_DELAY = 30
 
 # 实体类型常量
 ENTITY_TYPE_NAME = "name"
@@ -43,4 +83,80 @@ CLEAN_REASON_MAP = {
 
 # 间隔设置范围（分钟）
 MIN_INTERVAL = 10
-MAX_INTERVAL = 43200  # 30天
\ No newline at end of file
+MAX_INTERVAL = 43200  # 30天
+# 云端接口失败重试与熔断（秒）
+REQUEST_RETRIES = 1
+REQUEST_RETRY_DELAY = 1
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_COOLDOWN = 30
+BREAKER_MAX_COOLDOWN = 900
+
+# 云端连接池：每个主机的连接上限、空闲连接保活与 DNS 缓存时间（秒）
+POOL_LIMIT = 30
+POOL_LIMIT_PER_HOST = 20
+POOL_KEEPALIVE_TIMEOUT = 60
+POOL_DNS_CACHE_TTL = 300
+# 等待空闲连接超过该时间视为连接池饱和（秒）
+POOL_WAIT_WARNING = 1
+
+# 局域网直连：设备在本地提供与云端相同的接口
+DEFAULT_LOCAL_PORT = 80
+LOCAL_REQUEST_TIMEOUT = 3
+# 本地请求失败后改走云端，冷却时间（秒）按失败次数加倍
+LOCAL_RETRY_COOLDOWN = 30
+
+# 诊断传感器刷新间隔（秒），云端中断时没有轮询结果也要更新
+METRICS_UPDATE_INTERVAL = 60
+
+# 推送通道（秒）
+CONF_PUSH = "push"
+PUSH_HEARTBEAT = 30
+PUSH_RECONNECT_MIN = 1
+PUSH_RECONNECT_MAX = 300
+
+# 控制命令合并（秒）
+COMMAND_DEBOUNCE = 0.5
+COMMAND_MAX_DELAY = 2
+
+# 离线命令队列：设备或云端不可达时保存命令，恢复后重发；过期时间（分钟），0 表示不保存
+CONF_COMMAND_EXPIRY = "command_expiry"
+DEFAULT_COMMAND_EXPIRY = 60
+MAX_COMMAND_EXPIRY = 1440
+COMMAND_STORAGE_VERSION = 1
+COMMAND_SAVE_DELAY = 1
+
+# 乐观更新：命令成功后确认刷新的延时与等待设备生效的最长时间（秒）
+OPTIMISTIC_CONFIRM_DELAY = 3
+OPTIMISTIC_TIMEOUT = 60
+
+# 设备状态磁盘缓存：写入延时与云端中断时沿用旧数据的最长时间（秒）
+CACHE_STORAGE_VERSION = 1
+CACHE_SAVE_DELAY = 30
+STALE_DATA_TOLERANCE = 900
+# 设备连续多少次成功查询都不在响应中才视为已解绑
+DEVICE_MISSING_POLLS = 3
+
+# 本地清洗历史：统计值是累计量，只保留最近的记录
+HISTORY_STORAGE_VERSION = 1
+HISTORY_SAVE_DELAY = 60
+HISTORY_MAX_RECORDS = 500
+
+# 总线事件：新的清洗记录和设备上下线，设备触发器基于这两个事件
+EVENT_CLEANED = f"{DOMAIN}_cleaned"
+EVENT_NETWORK_CHANGED = f"{DOMAIN}_network_changed"
+ATTR_UID = "uid"
+ATTR_TIMESTAMP = "timestamp"
+ATTR_REASON = "reason"
+ATTR_NETWORK = "network"
+
+# 服务
+SERVICE_CLEAN = "clean"
+SERVICE_SET_INTERVAL = "set_interval"
+ATTR_INTERVAL = "interval"
+
+# 性能分析服务：分析时长（秒）
+SERVICE_PROFILE = "profile"
+ATTR_DURATION = "duration"
+DEFAULT_PROFILE_DURATION = 60
+# cProfile 会拖慢整个事件循环，只允许短时间分析
+MAX_PROFILE_DURATION = 300
@@ -0,0 +1,124 @@
+"""Per-device state for the DrumFilter integration."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.helpers.device_registry import DeviceInfo
+
+from .const import DEVICE_MISSING_POLLS, DOMAIN
+from .exceptions import DrumFilterError
+from .models import DrumFilterSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+def device_payloads(data: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return the per-device payloads of a query response."""
+    # 多设备账户返回 devices 列表，单设备直接在顶层返回
+    if not isinstance(data, dict):
+        raise DrumFilterError("Malformed response, expected an object")
+    payloads = (data["devices"] or []) if "devices" in data else [data]
+    if not isinstance(payloads, list) or not all(
+        isinstance(payload, dict) for payload in payloads
+    ):
+        raise DrumFilterError("Malformed device list in response")
+    return payloads
+
+class DrumFilterDevice:
+    """Sync state of one device: its snapshot and records cursor."""
+
+    def __init__(self, uid: str) -> None:
+        """Initialize the device."""
+        self.uid = uid
+        self.snapshot = DrumFilterSnapshot(uid=uid)
+        # 最后一条记录的时间戳，只同步比它新的记录
+        self.records_cursor: float | None = None
+        self.new_records: list[dict[str, Any]] = []
+        # 连续未出现在完整响应中的次数
+        self.missed_polls = 0
+
+    @classmethod
+    def from_cache(cls, uid: str, cached: dict[str, Any]) -> DrumFilterDevice | None:
+        """Restore a device saved with ``as_cache``."""
+        try:
+            if not (snapshot := cached.get("snapshot")):
+                return None
+            device = cls(uid)
+            device.snapshot = DrumFilterSnapshot.from_dict(snapshot)
+        except (AttributeError, KeyError, TypeError, ValueError) as err:
+            raise DrumFilterError(f"Malformed cached device {uid}: {err!r}") from err
+        device.records_cursor = cached.get("cursor")
+        return device
+
+    def as_cache(self) -> dict[str, Any]:
+        """Return the device state worth keeping across restarts."""
+        return {
+            "snapshot": self.snapshot.as_dict(),
+            "cursor": self.records_cursor,
+        }
+
+    def as_state(self) -> tuple[DrumFilterSnapshot, float | None, int]:
+        """Return the sync state to roll back to if a payload is rejected."""
+        return self.snapshot, self.records_cursor, self.missed_polls
+
+    def load_state(self, state: tuple[DrumFilterSnapshot, float | None, int]) -> None:
+        """Roll back to a state returned by ``as_state``."""
+        self.snapshot, self.records_cursor, self.missed_polls = state
+        self.new_records = []
+
+    def mark_missing(self) -> bool:
+        """Count one more miss and return True once the device should be dropped."""
+        self.missed_polls += 1
+        _LOGGER.debug("Device %s missing from response (%s)", self.uid, self.missed_polls)
+        return self.missed_polls >= DEVICE_MISSING_POLLS
+
+    def get_device_info(self) -> DeviceInfo:
+        """Get Home Assistant device info."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self.uid)},
+            name=self.snapshot.name,
+            manufacturer="DrumFilter",
+            model=self.snapshot.model,
+        )
+
+    def process_payload(self, data: dict[str, Any]) -> DrumFilterSnapshot:
+        """Apply this device's payload and return the new snapshot."""
+        self.missed_polls = 0
+        records = data.get("records") or []
+        self.new_records, total = self._sync_records(records, data.get("total"))
+        # 只保留最后一条记录，不保留完整的 records 数组
+        self.snapshot = DrumFilterSnapshot.from_payload(
+            data,
+            self.snapshot,
+            self.new_records[-1] if self.new_records else None,
+            total,
+        )
+        return self.snapshot
+
+    def _sync_records(
+        self, records: list[dict[str, Any]], total: int | None
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Merge the returned records into the cursor, return new records and total."""
+        # 支持 since 的服务器只返回新记录和 total，否则从末尾向前找出新记录
+        cursor = self.records_cursor
+        if cursor is None:
+            new_records = records
+        else:
+            index = len(records)
+            while index > 0 and (records[index - 1].get("time") or 0) > cursor:
+                index -= 1
+            new_records = records[index:]
+
+        if total is None:
+            if cursor is None or len(new_records) < len(records):
+                # 服务器返回了完整列表
+                total = len(records)
+            else:
+                total = self.snapshot.total_records + len(new_records)
+
+        if new_records:
+            if last_time := new_records[-1].get("time"):
+                self.records_cursor = last_time
+            _LOGGER.debug("Synced %s new record(s) for %s", len(new_records), self.uid)
+
+        return new_records, total
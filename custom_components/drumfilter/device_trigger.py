@@ -0,0 +1,81 @@
+"""Device triggers for the DrumFilter integration."""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components.device_automation import DEVICE_TRIGGER_BASE_SCHEMA
+from homeassistant.components.homeassistant.triggers import event as event_trigger
+from homeassistant.const import (
+    CONF_DEVICE_ID,
+    CONF_DOMAIN,
+    CONF_EVENT,
+    CONF_PLATFORM,
+    CONF_TYPE,
+)
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers.trigger import TriggerActionType, TriggerInfo
+from homeassistant.helpers.typing import ConfigType
+
+from .const import (
+    ATTR_NETWORK,
+    ATTR_REASON,
+    CLEAN_REASON_MAP,
+    DOMAIN,
+    EVENT_CLEANED,
+    EVENT_NETWORK_CHANGED,
+)
+
+# 触发器类型 -> (事件类型, 需要匹配的事件字段)
+TRIGGERS: dict[str, tuple[str, dict[str, str]]] = {
+    **{
+        f"cleaned_{reason}": (EVENT_CLEANED, {ATTR_REASON: reason})
+        for reason in CLEAN_REASON_MAP
+    },
+    "online": (EVENT_NETWORK_CHANGED, {ATTR_NETWORK: "online"}),
+    "offline": (EVENT_NETWORK_CHANGED, {ATTR_NETWORK: "offline"}),
+}
+
+TRIGGER_SCHEMA = DEVICE_TRIGGER_BASE_SCHEMA.extend(
+    {vol.Required(CONF_TYPE): vol.In(TRIGGERS)}
+)
+
+async def async_get_triggers(
+    hass: HomeAssistant, device_id: str
+) -> list[dict[str, Any]]:
+    """Return the triggers of a DrumFilter device."""
+    return [
+        {
+            CONF_PLATFORM: "device",
+            CONF_DEVICE_ID: device_id,
+            CONF_DOMAIN: DOMAIN,
+            CONF_TYPE: trigger_type,
+        }
+        for trigger_type in TRIGGERS
+    ]
+
+async def async_attach_trigger(
+    hass: HomeAssistant,
+    config: ConfigType,
+    action: TriggerActionType,
+    trigger_info: TriggerInfo,
+) -> CALLBACK_TYPE:
+    """Listen for the event behind a trigger, limited to one device."""
+    event_type, event_data = TRIGGERS[config[CONF_TYPE]]
+    return await event_trigger.async_attach_trigger(
+        hass,
+        event_trigger.TRIGGER_SCHEMA(
+            {
+                event_trigger.CONF_PLATFORM: CONF_EVENT,
+                event_trigger.CONF_EVENT_TYPE: event_type,
+                event_trigger.CONF_EVENT_DATA: {
+                    CONF_DEVICE_ID: config[CONF_DEVICE_ID],
+                    **event_data,
+                },
+            }
+        ),
+        action,
+        trigger_info,
+        platform_type="device",
+    )
@@ -0,0 +1,70 @@
+"""Diagnostics support for the DrumFilter integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_TOKEN
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_HUB, DOMAIN
+
+TO_REDACT = {CONF_TOKEN}
+
+def _device_diagnostics(data: dict[str, Any], uid: str) -> dict[str, Any]:
+    """Return the state, history and held commands of one device."""
+    coordinator = data["coordinator"]
+    history = coordinator.histories.get(uid)
+    commands = data["commands"].get(uid)
+    return {
+        "state": coordinator.data[uid].as_dict(),
+        "held_commands": commands.held if commands else None,
+        "history": {
+            "stored_records": len(history.records),
+            "count": history.count,
+            "by_reason": history.by_reason,
+        }
+        if history
+        else None,
+    }
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    api = data["api"]
+    coordinator = data["coordinator"]
+    hub = hass.data[DOMAIN][DATA_HUB]
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "devices": {
+            uid: _device_diagnostics(data, uid)
+            for uid in (coordinator.data or {})
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "last_exception": repr(coordinator.last_exception)
+            if coordinator.last_exception
+            else None,
+            "poll_interval": coordinator.poll_interval,
+            "push_connected": coordinator.push_connected,
+            "last_cycle_requests": coordinator.last_cycle_requests,
+        },
+        "metrics": api.metrics.as_dict(),
+        "transport": {
+            "last_used": api.last_transport,
+            "local_breaker": api.local.breaker.as_dict() if api.local else None,
+        },
+        "hub": {
+            "entries": len(hub.coordinators),
+            "batch_supported": hub.batch_supported,
+            "breaker": hub.breaker.as_dict(),
+            "metrics": hub.metrics.as_dict(),
+        },
+    }
@@ -0,0 +1,75 @@
+"""Base entity for the DrumFilter integration."""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .models import DrumFilterSnapshot
+
+@callback
+def async_add_device_entities(
+    entry: ConfigEntry,
+    coordinator,
+    async_add_entities: AddEntitiesCallback,
+    entities_for_device: Callable[[str], list[Entity]],
+) -> None:
+    """Add the entities of every device now and of each device that appears."""
+    # 离开的设备连同实体从设备注册表移除，重新出现时再添加
+    known: set[str] = set()
+
+    @callback
+    def _async_add_new_devices() -> None:
+        uids = (coordinator.data or {}).keys()
+        known.intersection_update(uids)
+        if new := uids - known:
+            known.update(new)
+            async_add_entities(
+                [entity for uid in new for entity in entities_for_device(uid)]
+            )
+
+    _async_add_new_devices()
+    entry.async_on_unload(coordinator.async_add_listener(_async_add_new_devices))
+
+class DrumFilterEntity(CoordinatorEntity):
+    """Base class for entities backed by the DrumFilter coordinator."""
+
+    # 状态依赖的快照字段，更新未改变这些字段和可用性时跳过写入；None 表示每次都写入
+    _fields: frozenset[str] | None = None
+
+    def __init__(self, coordinator, api, uid: str) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._api = api
+        self._uid = uid
+        self._attr_device_info = api.devices[uid].get_device_info()
+        self._last_available: bool | None = None
+
+    @property
+    def snapshot(self) -> DrumFilterSnapshot | None:
+        """Return the current state of this entity's device."""
+        return (self.coordinator.data or {}).get(self._uid)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if a relevant field or availability changed."""
+        available = self.available
+        if (
+            self._fields is not None
+            and available == self._last_available
+            and self._fields.isdisjoint(
+                self.coordinator.changed_fields.get(self._uid, ())
+            )
+        ):
+            return
+        self._last_available = available
+        super()._handle_coordinator_update()
+
+    @property
+    def available(self) -> bool:
+        """Stay available on recent data through short cloud outages."""
+        return self.coordinator.data_available and self.snapshot is not None
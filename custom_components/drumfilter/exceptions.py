@@ -0,0 +1,21 @@
+"""Exceptions for the DrumFilter integration."""
+from __future__ import annotations
+
+from homeassistant.exceptions import HomeAssistantError
+
+class DrumFilterError(HomeAssistantError):
+    """Base error for the DrumFilter cloud API."""
+
+class DrumFilterConnectionError(DrumFilterError):
+    """The cloud API could not be reached or returned a server error."""
+
+class DrumFilterTimeoutError(DrumFilterConnectionError):
+    """No response arrived in time, the request may still have been applied."""
+
+class DrumFilterCircuitOpenError(DrumFilterConnectionError):
+    """The request was not sent because the circuit breaker is open."""
+
+    def __init__(self, retry_in: float) -> None:
+        """Initialize with the seconds left until the next probe."""
+        super().__init__(f"Cloud API unavailable, next attempt in {retry_in:.0f}s")
+        self.retry_in = retry_in
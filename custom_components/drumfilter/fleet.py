@@ -0,0 +1,189 @@
+"""Domain-wide index of DrumFilter device state."""
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Callable
+from datetime import datetime
+import heapq
+import logging
+from time import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .const import ATTR_TIMESTAMP, ATTR_UID, EVENT_CLEANED
+from .history import DAY_SECONDS
+from .models import DrumFilterSnapshot
+
+if TYPE_CHECKING:
+    from . import DrumFilterDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# 惰性删除的堆中过期条目超过有效条目的倍数时重建
+HEAP_REBUILD_FACTOR = 2
+
+class DrumFilterFleet:
+    """Aggregates over every device, updated per changed device without a rescan."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the index."""
+        self.hass = hass
+        self.network_counts: Counter[str] = Counter()
+        self._network: dict[str, str] = {}
+        self._last_clean: dict[str, float] = {}
+        # (最近清洗时间, 设备) 的堆，过时的条目到达堆顶时才丢弃
+        self._oldest: list[tuple[float, str]] = []
+        # 24 小时内的清洗 (时间, 设备) 的堆，由 drumfilter_cleaned 事件添加，到期后移除
+        self._cleans: list[tuple[float, str]] = []
+        self._listeners: dict[CALLBACK_TYPE, None] = {}
+        self._unsub_expire: CALLBACK_TYPE | None = None
+        self._expire_at: float | None = None
+        hass.bus.async_listen(EVENT_CLEANED, self._async_cleaned)
+
+    @property
+    def device_count(self) -> int:
+        """Return the number of devices in the fleet."""
+        return len(self._network)
+
+    @property
+    def cleans_last_24h(self) -> int:
+        """Return the number of cleans across the fleet in the last 24 hours."""
+        self._trim_cleans()
+        return len(self._cleans)
+
+    @property
+    def oldest_clean(self) -> tuple[float, str] | None:
+        """Return the oldest last clean time and its device."""
+        while self._oldest:
+            record_time, uid = self._oldest[0]
+            if self._last_clean.get(uid) == record_time:
+                return record_time, uid
+            heapq.heappop(self._oldest)
+        return None
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Call ``update_callback`` whenever an aggregate may have changed."""
+        self._listeners[update_callback] = None
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.pop(update_callback, None)
+
+        return remove_listener
+
+    @callback
+    def async_track_entry(
+        self, coordinator: DrumFilterDataUpdateCoordinator
+    ) -> Callable[[], None]:
+        """Follow the devices of one config entry and return an untrack callback."""
+        tracked: set[str] = set()
+
+        @callback
+        def _async_coordinator_updated() -> None:
+            data = coordinator.data or {}
+            departed = tracked - data.keys()
+            for uid in departed:
+                self._remove(uid)
+            tracked.difference_update(departed)
+
+            for uid in coordinator.changed_fields.keys() & data.keys():
+                if uid not in tracked:
+                    tracked.add(uid)
+                    self._seed_cleans(uid, coordinator.histories[uid].recent_times)
+                self._update(uid, data[uid])
+
+            if departed or coordinator.changed_fields:
+                self._async_notify()
+
+        @callback
+        def _async_untrack() -> None:
+            unsub()
+            for uid in tracked:
+                self._remove(uid)
+            tracked.clear()
+            self._async_notify()
+
+        for uid, snapshot in (coordinator.data or {}).items():
+            tracked.add(uid)
+            self._seed_cleans(uid, coordinator.histories[uid].recent_times)
+            self._update(uid, snapshot)
+        unsub = coordinator.async_add_listener(_async_coordinator_updated)
+        self._async_notify()
+        return _async_untrack
+
+    def _update(self, uid: str, snapshot: DrumFilterSnapshot) -> None:
+        """Apply the state of one device."""
+        if (old := self._network.get(uid)) != snapshot.network:
+            if old is not None:
+                self.network_counts[old] -= 1
+            self.network_counts[snapshot.network] += 1
+            self._network[uid] = snapshot.network
+
+        record_time = snapshot.last_record_time
+        if record_time and self._last_clean.get(uid) != record_time:
+            self._last_clean[uid] = record_time
+            heapq.heappush(self._oldest, (record_time, uid))
+            if len(self._oldest) > HEAP_REBUILD_FACTOR * len(self._last_clean):
+                self._oldest = [(t, u) for u, t in self._last_clean.items()]
+                heapq.heapify(self._oldest)
+
+    def _remove(self, uid: str) -> None:
+        """Drop a device from the index."""
+        if (network := self._network.pop(uid, None)) is not None:
+            self.network_counts[network] -= 1
+        self._last_clean.pop(uid, None)
+        # 设备很少移除，直接重建清洗堆
+        self._cleans = [entry for entry in self._cleans if entry[1] != uid]
+        heapq.heapify(self._cleans)
+
+    def _seed_cleans(self, uid: str, times: list[float]) -> None:
+        """Add the recent cleans of a device joining the index."""
+        for record_time in times:
+            heapq.heappush(self._cleans, (record_time, uid))
+
+    @callback
+    def _async_cleaned(self, event: Event) -> None:
+        """Count a new clean of a tracked device."""
+        uid = event.data[ATTR_UID]
+        if uid not in self._network:
+            # 尚未加入索引的设备加入时从历史记录补齐
+            return
+        record_time = event.data[ATTR_TIMESTAMP]
+        if record_time > time() - DAY_SECONDS:
+            heapq.heappush(self._cleans, (record_time, uid))
+            self._async_notify()
+
+    def _trim_cleans(self) -> None:
+        """Drop cleans older than 24 hours."""
+        cutoff = time() - DAY_SECONDS
+        while self._cleans and self._cleans[0][0] <= cutoff:
+            heapq.heappop(self._cleans)
+
+    @callback
+    def _async_notify(self) -> None:
+        """Tell the sensors and re-arm the 24 hour expiry timer."""
+        self._trim_cleans()
+        expire_at = self._cleans[0][0] + DAY_SECONDS if self._cleans else None
+        if expire_at != self._expire_at:
+            self._expire_at = expire_at
+            if self._unsub_expire is not None:
+                self._unsub_expire()
+                self._unsub_expire = None
+            if expire_at is not None:
+                self._unsub_expire = async_track_point_in_time(
+                    self.hass, self._async_expire, dt_util.utc_from_timestamp(expire_at)
+                )
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _async_expire(self, _now: datetime) -> None:
+        """Update the sensors once the oldest counted clean is 24 hours old."""
+        self._unsub_expire = None
+        self._expire_at = None
+        _LOGGER.debug("Fleet clean expired from the 24 hour window")
+        self._async_notify()
@@ -0,0 +1,186 @@
+"""Local cleaning history for the DrumFilter integration."""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+from datetime import datetime
+import logging
+import sys
+from time import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    HISTORY_MAX_RECORDS,
+    HISTORY_SAVE_DELAY,
+    HISTORY_STORAGE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DAY_SECONDS = 86400
+
+class DrumFilterHistory:
+    """Keep cleaning records on disk and maintain statistics as they arrive."""
+
+    def __init__(self, hass: HomeAssistant, storage_key: str) -> None:
+        """Initialize the history of one device."""
+        # storage_key 为配置条目 ID 加设备 uid
+        self.hass = hass
+        self._store: Store = Store(
+            hass, HISTORY_STORAGE_VERSION, f"{DOMAIN}.{storage_key}.history"
+        )
+        # 按时间排序、按时间戳去重的 [时间, 原因]，只保留最近的记录
+        self.records: deque[list[Any]] = deque(maxlen=HISTORY_MAX_RECORDS)
+        # 统计为累计值，随新记录更新并一同保存，裁剪旧记录后无需重新扫描
+        self.count = 0
+        self.by_reason: dict[str, int] = {}
+        self.first_time: float | None = None
+        self.last_time: float | None = None
+        self._recent: deque[float] = deque()
+        self._listeners: dict[CALLBACK_TYPE, None] = {}
+        self._unsub_expire: CALLBACK_TYPE | None = None
+        self._expire_at: float | None = None
+
+    async def async_load(self) -> None:
+        """Load the stored records and statistics."""
+        if not (stored := await self._store.async_load()):
+            return
+        self.records.extend(
+            [record_time, sys.intern(reason)]
+            for record_time, reason in stored.get("records", [])
+        )
+        stats = stored.get("stats", {})
+        self.count = stats.get("count", len(self.records))
+        self.by_reason = stats.get("by_reason", {})
+        self.first_time = stats.get("first_time")
+        self.last_time = stats.get("last_time")
+
+        cutoff = time() - DAY_SECONDS
+        for record_time, _ in reversed(self.records):
+            if record_time <= cutoff:
+                break
+            self._recent.appendleft(record_time)
+        self._async_schedule_expiry()
+
+    async def async_remove(self) -> None:
+        """Delete the stored history."""
+        await self._store.async_remove()
+
+    def add_records(self, records: list[dict[str, Any]]) -> list[list[Any]]:
+        """Append new records, update the statistics and return the pairs added."""
+        added: list[list[Any]] = []
+        for record in records:
+            record_time = record.get("time")
+            if not record_time:
+                continue
+            if self.last_time is not None and record_time <= self.last_time:
+                continue
+            # 原因只有几种取值，共用同一个字符串对象
+            reason = sys.intern(record.get("reason", "unknown"))
+
+            self.records.append(entry := [record_time, reason])
+            self.count += 1
+            self.by_reason[reason] = self.by_reason.get(reason, 0) + 1
+            if self.first_time is None:
+                self.first_time = record_time
+            self.last_time = record_time
+            self._recent.append(record_time)
+            added.append(entry)
+
+        if added:
+            self._store.async_delay_save(self._data_to_save, HISTORY_SAVE_DELAY)
+            self._async_schedule_expiry()
+            _LOGGER.debug("Added %s record(s) to history", len(added))
+        return added
+
+    @property
+    def cleans_last_24h(self) -> int:
+        """Return the number of cleans in the last 24 hours."""
+        self._trim_recent()
+        return len(self._recent)
+
+    @property
+    def recent_times(self) -> list[float]:
+        """Return the times of the cleans in the last 24 hours."""
+        self._trim_recent()
+        return list(self._recent)
+
+    def _trim_recent(self) -> None:
+        """Drop cleans older than 24 hours from the recent window."""
+        cutoff = time() - DAY_SECONDS
+        while self._recent and self._recent[0] <= cutoff:
+            self._recent.popleft()
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Call ``update_callback`` when a clean leaves the 24 hour window."""
+        self._listeners[update_callback] = None
+        self._async_schedule_expiry()
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.pop(update_callback, None)
+            self._async_schedule_expiry()
+
+        return remove_listener
+
+    @callback
+    def _async_schedule_expiry(self) -> None:
+        """Arm the timer for the oldest recent clean, only while followed."""
+        self._trim_recent()
+        expire_at = (
+            self._recent[0] + DAY_SECONDS if self._recent and self._listeners else None
+        )
+        if expire_at == self._expire_at:
+            return
+        self._expire_at = expire_at
+        if self._unsub_expire is not None:
+            self._unsub_expire()
+            self._unsub_expire = None
+        if expire_at is not None:
+            self._unsub_expire = async_track_point_in_time(
+                self.hass, self._async_expire, dt_util.utc_from_timestamp(expire_at)
+            )
+
+    @callback
+    def _async_expire(self, _now: datetime) -> None:
+        """Tell the listeners that a clean is now older than 24 hours."""
+        self._unsub_expire = None
+        self._expire_at = None
+        self._async_schedule_expiry()
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @property
+    def mean_interval(self) -> float | None:
+        """Return the mean time between cleans in minutes."""
+        if self.count < 2 or self.first_time is None or self.last_time is None:
+            return None
+        return round((self.last_time - self.first_time) / (self.count - 1) / 60, 1)
+
+    @property
+    def trigger_rate(self) -> float | None:
+        """Return the share of automatic cleans triggered by water level."""
+        limit = self.by_reason.get("limit", 0)
+        automatic = limit + self.by_reason.get("timing", 0)
+        if not automatic:
+            return None
+        return round(limit / automatic * 100, 1)
+
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to store."""
+        return {
+            "records": list(self.records),
+            "stats": {
+                "count": self.count,
+                "by_reason": self.by_reason,
+                "first_time": self.first_time,
+                "last_time": self.last_time,
+            },
+        }
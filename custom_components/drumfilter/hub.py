@@ -0,0 +1,291 @@
+"""Shared polling hub for all DrumFilter config entries."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util.json import json_loads_object
+
+from .breaker import CircuitBreaker
+from .const import (
+    API_QUERY_BATCH,
+    BATCH_REPROBE_INTERVAL,
+    COMMAND_MAX_CONCURRENCY,
+    MAX_CONCURRENT_QUERIES,
+    POLL_ALIGN_WINDOW,
+    POLL_TICK_TIMEOUT,
+)
+from .exceptions import DrumFilterConnectionError, DrumFilterError
+from .metrics import DrumFilterMetrics
+from .request import (
+    RequestCounter,
+    async_create_session,
+    async_post,
+    count_requests,
+    current_request_counter,
+)
+
+if TYPE_CHECKING:
+    from . import DrumFilterAPI, DrumFilterDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+# 批量接口不存在时返回的状态码
+BATCH_UNSUPPORTED_STATUS = (404, 405, 501)
+
+class DrumFilterHub:
+    """Poll every due coordinator from one timer and batch their queries."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the hub."""
+        self.hass = hass
+        self.breaker = CircuitBreaker()
+        self.metrics = DrumFilterMetrics()
+        # 所有设备共用的会话，最后一个条目卸载或 HA 停止时关闭
+        self.websession = async_create_session(hass, self.metrics)
+        self._unsub_close = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_CLOSE, self._async_on_close
+        )
+        self._coordinators: dict[str, DrumFilterDataUpdateCoordinator] = {}
+        # Token -> (客户端, 结果, 等待者所在轮询周期的请求计数器)
+        self._pending: dict[
+            str, tuple[DrumFilterAPI, asyncio.Future, list[RequestCounter]]
+        ] = {}
+        self._flush_scheduled = False
+        self._batch_supported: bool | None = None
+        self._batch_retry_at = 0.0
+        # 没有批量接口时逐个查询，限制并发连接数
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+        # 所有条目的控制命令共用，服务一次选中大量设备时限制同时发出的请求
+        self.command_semaphore = asyncio.Semaphore(COMMAND_MAX_CONCURRENCY)
+        self._unsub_tick: CALLBACK_TYPE | None = None
+        self._tick_running = False
+
+    @property
+    def coordinators(self) -> list[DrumFilterDataUpdateCoordinator]:
+        """Return the registered coordinators."""
+        return list(self._coordinators.values())
+
+    @property
+    def batch_supported(self) -> bool | None:
+        """Return whether the backend accepts batched queries, if known."""
+        return self._batch_supported
+
+    @property
+    def batch_enabled(self) -> bool:
+        """Return True if the next queries should try the batch endpoint."""
+        return self._batch_supported is not False or monotonic() >= self._batch_retry_at
+
+    @property
+    def is_empty(self) -> bool:
+        """Return True when no config entry is registered."""
+        return not self._coordinators
+
+    async def async_close(self) -> None:
+        """Stop the tick and close the HTTP session."""
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+        if self._unsub_close is not None:
+            self._unsub_close()
+            self._unsub_close = None
+        await self.websession.close()
+
+    async def _async_on_close(self, _event: Event) -> None:
+        """Close the HTTP session when Home Assistant stops."""
+        self._unsub_close = None
+        await self.async_close()
+
+    @callback
+    def async_register(
+        self, entry_id: str, coordinator: DrumFilterDataUpdateCoordinator
+    ) -> None:
+        """Register a coordinator to be refreshed on the shared tick."""
+        self._coordinators[entry_id] = coordinator
+        self.async_schedule()
+
+    @callback
+    def async_unregister(self, entry_id: str) -> None:
+        """Remove a coordinator and stop the tick when none are left."""
+        self._coordinators.pop(entry_id, None)
+        self.async_schedule()
+
+    @callback
+    def async_schedule(self) -> None:
+        """Arm the timer for the earliest coordinator deadline."""
+        if self._unsub_tick is not None:
+            self._unsub_tick()
+            self._unsub_tick = None
+        if not self._coordinators or self._tick_running:
+            # 正在轮询时由轮询结束后统一重新安排
+            return
+
+        next_poll = min(c.next_poll for c in self._coordinators.values())
+        self._unsub_tick = async_call_later(
+            self.hass, max(next_poll - monotonic(), 0), self._async_tick
+        )
+
+    async def _async_tick(self, _now: datetime) -> None:
+        """Refresh every coordinator that is due."""
+        self._unsub_tick = None
+        deadline = monotonic() + POLL_ALIGN_WINDOW
+        due = [c for c in self._coordinators.values() if c.next_poll <= deadline]
+        self._tick_running = True
+        try:
+            if due:
+                async with asyncio.timeout(POLL_TICK_TIMEOUT):
+                    await asyncio.gather(
+                        *(coordinator.async_refresh() for coordinator in due)
+                    )
+        except TimeoutError:
+            _LOGGER.warning(
+                "Poll of %s entries did not finish within %ss, cancelled",
+                len(due),
+                POLL_TICK_TIMEOUT,
+            )
+        finally:
+            self._tick_running = False
+            self.async_schedule()
+
+    async def async_query(self, api: DrumFilterAPI) -> dict[str, Any] | None:
+        """Query one device through the batch or the bounded fan-out path."""
+        if not self.batch_enabled:
+            return await self._async_query_single(api)
+
+        counter = current_request_counter()
+        if (pending := self._pending.get(api.token)) is not None:
+            # 同一 Token 已在等待本轮的批量查询，共用其结果
+            if counter is not None:
+                pending[2].append(counter)
+            return await asyncio.shield(pending[1])
+
+        future = self.hass.loop.create_future()
+        self._pending[api.token] = (api, future, [counter] if counter else [])
+        if not self._flush_scheduled:
+            # 同一轮事件循环内的查询合并为一次请求
+            self._flush_scheduled = True
+            self.hass.loop.call_soon(
+                lambda: self.hass.async_create_background_task(
+                    self._async_flush(), "drumfilter hub flush"
+                )
+            )
+        return await asyncio.shield(future)
+
+    async def _async_query_single(self, api: DrumFilterAPI) -> dict[str, Any] | None:
+        """Query one device while holding a connection slot."""
+        async with self._semaphore:
+            return await api.async_fetch_payload()
+
+    async def _async_flush(self) -> None:
+        """Send all pending queries."""
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        single = pending
+        if self.batch_enabled:
+            batch_counter = RequestCounter()
+            try:
+                with count_requests() as batch_counter:
+                    results = await self._async_query_batch(
+                        [api for api, _, _ in pending.values()]
+                    )
+            except DrumFilterConnectionError as err:
+                # 云端不可达时逐个查询也无济于事
+                for _, future, _ in pending.values():
+                    if not future.done():
+                        future.set_exception(err)
+                return
+            except DrumFilterError as err:
+                _LOGGER.debug("Batch query failed (%s), querying one by one", err)
+                results = None
+            finally:
+                # 一次批量请求计入每个参与的轮询周期
+                for _, _, counters in pending.values():
+                    for counter in counters:
+                        counter.count += batch_counter.count
+
+            if results is not None:
+                single = {}
+                for token, (api, future, counters) in pending.items():
+                    if token not in results:
+                        single[token] = (api, future, counters)
+                    elif not future.done():
+                        future.set_result(api.batch_payload(results[token]))
+                if single:
+                    _LOGGER.debug(
+                        "%s token(s) missing from batch response, querying them alone",
+                        len(single),
+                    )
+
+        await asyncio.gather(
+            *(self._async_resolve_single(*query) for query in single.values())
+        )
+
+    async def _async_resolve_single(
+        self,
+        api: DrumFilterAPI,
+        future: asyncio.Future,
+        counters: list[RequestCounter],
+    ) -> None:
+        """Run a single query and hand its outcome to the waiting caller."""
+        counter = RequestCounter()
+        try:
+            with count_requests() as counter:
+                result = await self._async_query_single(api)
+        except Exception as err:  # pylint: disable=broad-except
+            if not future.done():
+                future.set_exception(err)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            for waiter in counters:
+                waiter.count += counter.count
+
+    async def _async_query_batch(
+        self, apis: list[DrumFilterAPI]
+    ) -> dict[str, dict[str, Any]] | None:
+        """Query many tokens in one request, None if there is no batch endpoint."""
+        _LOGGER.debug("Sending batched query for %s device(s)", len(apis))
+        status, body, _ = await async_post(
+            self.websession,
+            self.breaker,
+            API_QUERY_BATCH,
+            {"queries": [api.query_payload() for api in apis]},
+            self.metrics,
+        )
+
+        if status in BATCH_UNSUPPORTED_STATUS:
+            _LOGGER.info("Batch query not supported, falling back to single queries")
+            self._batch_supported = False
+            self._batch_retry_at = monotonic() + BATCH_REPROBE_INTERVAL
+            return None
+
+        # 其他错误不代表接口不存在，下一轮仍然先尝试批量查询
+        self._batch_supported = None
+        if status != 200:
+            self.metrics.record_error(f"http_{status}")
+            raise DrumFilterError(f"HTTP error: {status}")
+
+        start = monotonic()
+        try:
+            data = json_loads_object(body)
+        except ValueError as err:
+            self.metrics.record_error("invalid_json")
+            raise DrumFilterError(f"Invalid batch response: {err}") from err
+        self.metrics.record_decode(monotonic() - start)
+        if not isinstance(results := data.get("results"), dict):
+            self.metrics.record_error("invalid_batch")
+            raise DrumFilterError("Batch response has no results")
+
+        self._batch_supported = True
+        self.metrics.coalesced += len(apis) - 1
+        return results
@@ -0,0 +1,94 @@
+"""Runtime metrics for the DrumFilter integration."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from typing import Any
+
+# 上游请求耗时直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class DrumFilterMetrics:
+    """Counters and a latency histogram for one device or the hub."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        # 每个记录方法都是 O(1)，可以常开并通过诊断读取
+        self.requests = 0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.bytes_received = 0
+        self.decodes = 0
+        self.decode_time = 0.0
+        self.polls_unchanged = 0
+        self.not_modified = 0
+        self.coalesced = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.pool_waits = 0
+        self.pool_wait_time = 0.0
+        self.pool_wait_max = 0.0
+        self.errors: Counter[str] = Counter()
+
+    @property
+    def latency_mean(self) -> float | None:
+        """Return the mean upstream latency in seconds."""
+        if not self.requests:
+            return None
+        return self.latency_total / self.requests
+
+    def record_request(self, duration: float, size: int) -> None:
+        """Record one completed upstream request."""
+        self.requests += 1
+        self.latency_buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.latency_total += duration
+        self.latency_max = max(self.latency_max, duration)
+        self.bytes_received += size
+
+    def record_decode(self, duration: float) -> None:
+        """Record the time spent decoding one JSON body."""
+        self.decodes += 1
+        self.decode_time += duration
+
+    def record_connection(self, reused: bool) -> None:
+        """Count a connection taken from the pool."""
+        if reused:
+            self.connections_reused += 1
+        else:
+            self.connections_created += 1
+
+    def record_pool_wait(self, duration: float) -> None:
+        """Record the time one request waited for a free connection."""
+        self.pool_waits += 1
+        self.pool_wait_time += duration
+        self.pool_wait_max = max(self.pool_wait_max, duration)
+
+    def record_error(self, kind: str) -> None:
+        """Count an error by type."""
+        self.errors[kind] += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        buckets = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [
+            f">{LATENCY_BUCKETS[-1]}s"
+        ]
+        mean = self.latency_mean
+        return {
+            "requests": self.requests,
+            "latency_histogram": dict(zip(buckets, self.latency_buckets)),
+            "latency_mean_ms": round(mean * 1000, 1) if mean is not None else None,
+            "latency_max_ms": round(self.latency_max * 1000, 1),
+            "bytes_received": self.bytes_received,
+            "json_decodes": self.decodes,
+            "json_decode_ms": round(self.decode_time * 1000, 3),
+            "polls_unchanged": self.polls_unchanged,
+            "not_modified": self.not_modified,
+            "coalesced": self.coalesced,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "pool_waits": self.pool_waits,
+            "pool_wait_ms": round(self.pool_wait_time * 1000, 1),
+            "pool_wait_max_ms": round(self.pool_wait_max * 1000, 1),
+            "errors": dict(self.errors),
+        }
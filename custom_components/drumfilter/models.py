@@ -0,0 +1,94 @@
+"""Data models for the DrumFilter integration."""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from .const import CLEAN_REASON_MAP, NETWORK_STATUS_MAP
+
+def _last_record_text(time: float | None, reason: str | None) -> str:
+    """Format the last record for display."""
+    if reason is None:
+        return "暂无记录"
+    reason_text = CLEAN_REASON_MAP.get(reason, reason)
+    if not time:
+        return f"时间未知 ({reason_text})"
+    local_time = dt_util.as_local(dt_util.utc_from_timestamp(time))
+    return f"{local_time.strftime('%m-%d %H:%M')} {reason_text}"
+
+@dataclass(frozen=True, slots=True)
+class DrumFilterSnapshot:
+    """Immutable device state, parsed once per poll."""
+
+    # 显示文本在构建时计算，实体读取状态只是属性访问；只保留最后一条记录
+    uid: str = "unknown"
+    name: str = "Unknown"
+    model: str = "DrumFilter"
+    interval: int = 0
+    network: str = "unknown"
+    network_label: str = "unknown"
+    last_record_time: float | None = None
+    last_record_reason: str | None = None
+    last_record_text: str = "暂无记录"
+    total_records: int = 0
+
+    @classmethod
+    def from_payload(
+        cls,
+        data: dict[str, Any],
+        previous: DrumFilterSnapshot,
+        last_record: dict[str, Any] | None,
+        total_records: int,
+    ) -> DrumFilterSnapshot:
+        """Build a snapshot, keeping the last record of ``previous`` if none is new."""
+        network = data.get("network", "offline")
+        if last_record is None:
+            record_time = previous.last_record_time
+            record_reason = previous.last_record_reason
+            record_text = previous.last_record_text
+        else:
+            record_time = last_record.get("time")
+            record_reason = last_record.get("reason", "unknown")
+            record_text = _last_record_text(record_time, record_reason)
+
+        return cls(
+            uid=data.get("uid", ""),
+            name=data.get("name", "DrumFilter"),
+            model=data.get("model", "DrumFilter"),
+            interval=data.get("interval", 10),
+            network=network,
+            network_label=NETWORK_STATUS_MAP.get(network, network),
+            last_record_time=record_time,
+            last_record_reason=record_reason,
+            last_record_text=record_text,
+            total_records=total_records,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> DrumFilterSnapshot:
+        """Restore a snapshot saved with ``as_dict``."""
+        known = {field.name for field in fields(cls)}
+        snapshot = cls(**{key: value for key, value in data.items() if key in known})
+        # 本地化文本按当前时区重新生成
+        return replace(
+            snapshot,
+            last_record_text=_last_record_text(
+                snapshot.last_record_time, snapshot.last_record_reason
+            ),
+        )
+
+    @property
+    def next_clean_time(self) -> float | None:
+        """Return when the next timed clean is expected."""
+        if not self.last_record_time or not self.interval:
+            return None
+        # 设备定时器在每次清洗后重新计时
+        return self.last_record_time + self.interval * 60
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the snapshot as a JSON-friendly dict."""
+        return asdict(self)
+
+SNAPSHOT_FIELDS = tuple(field.name for field in fields(DrumFilterSnapshot))
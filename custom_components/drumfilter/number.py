@@ -9,7 +9,9 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .commands import CommandResult
 from .const import DOMAIN
+from .entity import DrumFilterEntity, async_add_device_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,24 +25,27 @@ async def async_setup_entry(
     
     data = hass.data[DOMAIN][entry.entry_id]
     api = data["api"]
+    coordinator = data["coordinator"]
+    commands = data["commands"]
     
-    numbers = [
-        DrumFilterIntervalNumber(api),
-    ]
-    
-    async_add_entities(numbers, True)
+    def _numbers(uid: str) -> list[NumberEntity]:
+        return [DrumFilterIntervalNumber(coordinator, api, uid, commands[uid])]
+
+    async_add_device_entities(entry, coordinator, async_add_entities, _numbers)
     _LOGGER.debug("DrumFilter number setup completed")
 
-class DrumFilterIntervalNumber(NumberEntity):
+class DrumFilterIntervalNumber(DrumFilterEntity, NumberEntity):
     """Representation of a DrumFilter interval number entity."""
 
-    def __init__(self, api) -> None:
+    _fields = frozenset({"interval"})
+
+    def __init__(self, coordinator, api, uid: str, commands) -> None:
         """Initialize the number entity."""
-        self._api = api
+        super().__init__(coordinator, api, uid)
+        self._commands = commands
         self._attr_name = "清洗间隔"
-        self._attr_unique_id = f"{api.device_identifier}_interval"
+        self._attr_unique_id = f"{uid}_interval"
         self._attr_icon = "mdi:timer-cog"
-        self._attr_device_info = api.get_device_info()
         
         # 数字实体属性
         self._attr_native_min_value = 10
@@ -52,25 +57,29 @@ class DrumFilterIntervalNumber(NumberEntity):
         # 移除 entity_category，这样就会显示在首页
         # self._attr_entity_category = EntityCategory.CONFIG
 
-    async def async_update(self) -> None:
-        """Fetch new state data for the number entity."""
-        try:
-            await self._api.async_get_data()
-            self._attr_native_value = self._api.device_info.get("interval", 60)
-        except Exception as err:
-            _LOGGER.error("Error updating interval number: %s", err)
-            self._attr_native_value = 60
+    @property
+    def native_value(self) -> float | None:
+        """Return the current interval from the coordinator data."""
+        if (snapshot := self.snapshot) is None:
+            return None
+        return snapshot.interval
 
     async def async_set_native_value(self, value: float) -> None:
         """Update the current value."""
         try:
             _LOGGER.debug("Setting interval to: %s", value)
-            success = await self._api.async_control_device(interval=int(value))
-            if success:
-                self._attr_native_value = value
-                self.async_write_ha_state()
+            # 先显示新值，下一次轮询确认或回滚
+            self.coordinator.async_set_optimistic(self._uid, interval=int(value))
+            result = await self._commands.async_send(interval=int(value))
+            if result is CommandResult.SENT:
+                self.coordinator.async_request_confirm()
                 _LOGGER.info("Interval updated to %s minutes", value)
+            elif result is CommandResult.QUEUED:
+                # 设备恢复在线后重发，期间显示设备当前的值
+                self.coordinator.async_discard_optimistic(self._uid, "interval")
             else:
+                self.coordinator.async_discard_optimistic(self._uid, "interval")
                 _LOGGER.error("Failed to set interval")
         except Exception as err:
-            _LOGGER.error("Error setting interval: %s", err)
\ No newline at end of file
+            self.coordinator.async_discard_optimistic(self._uid, "interval")
+            _LOGGER.error("Error setting interval: %s", err)
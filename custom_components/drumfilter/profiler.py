@@ -0,0 +1,281 @@
+"""On-demand profiling of the DrumFilter hot paths."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine, Generator
+import cProfile
+from datetime import datetime
+import functools
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+from time import perf_counter, time
+from types import ModuleType
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+# 事件循环延迟的采样间隔（秒）
+LOOP_PROBE_INTERVAL = 0.1
+# 报告中 cProfile 输出的最大行数
+REPORT_MAX_FUNCTIONS = 60
+
+_PACKAGE_DIR = os.path.dirname(__file__)
+
+class PathStats:
+    """Timings of one code path during a profile."""
+
+    def __init__(self) -> None:
+        """Initialize the stats."""
+        self.calls = 0
+        # 协程各步占用事件循环的时间之和，wall 还包括挂起的时间
+        self.blocking = 0.0
+        self.blocking_max = 0.0
+        self.wall = 0.0
+
+    def record(self, blocking: float, wall: float) -> None:
+        """Record one call."""
+        self.calls += 1
+        self.blocking += blocking
+        self.blocking_max = max(self.blocking_max, blocking)
+        self.wall += wall
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stats in milliseconds."""
+        return {
+            "calls": self.calls,
+            "blocking_ms": round(self.blocking * 1000, 3),
+            "blocking_max_ms": round(self.blocking_max * 1000, 3),
+            "wall_ms": round(self.wall * 1000, 3),
+        }
+
+class _TimedAwaitable:
+    """Drive a coroutine and time each step it runs on the loop."""
+
+    __slots__ = ("_coro", "_stats")
+
+    def __init__(self, coro: Coroutine[Any, Any, Any], stats: PathStats) -> None:
+        self._coro = coro
+        self._stats = stats
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        coro = self._coro
+        started = perf_counter()
+        blocking = 0.0
+        value: Any = None
+        error: BaseException | None = None
+        try:
+            while True:
+                step = perf_counter()
+                try:
+                    if error is None:
+                        future = coro.send(value)
+                    else:
+                        future = coro.throw(error)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    blocking += perf_counter() - step
+                value = error = None
+                try:
+                    value = yield future
+                except GeneratorExit:
+                    coro.close()
+                    raise
+                except BaseException as err:  # noqa: BLE001 - 原样传给被测协程
+                    error = err
+        finally:
+            self._stats.record(blocking, perf_counter() - started)
+
+def _timed_function(func: Callable[..., Any], stats: PathStats) -> Callable[..., Any]:
+    """Wrap a plain function."""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            stats.record(elapsed, elapsed)
+
+    return wrapper
+
+def _timed_coroutine_function(
+    func: Callable[..., Coroutine[Any, Any, Any]], stats: PathStats
+) -> Callable[..., Coroutine[Any, Any, Any]]:
+    """Wrap a coroutine function."""
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await _TimedAwaitable(func(*args, **kwargs), stats)
+
+    return wrapper
+
+def _profiled_paths() -> list[tuple[str, type | ModuleType, str]]:
+    """Return the (name, owner, attribute) of every profiled code path."""
+    # 延迟导入，避免与集成模块循环导入
+    from . import DrumFilterAPI, DrumFilterDataUpdateCoordinator, hub, push, sensor
+
+    package = sys.modules[__package__]
+    paths: list[tuple[str, type | ModuleType, str]] = [
+        ("coordinator refresh", DrumFilterDataUpdateCoordinator, "_async_update_data"),
+        ("api query", DrumFilterAPI, "async_get_data"),
+        ("json decode (token)", package, "json_loads_object"),
+        ("json decode (hub)", hub, "json_loads_object"),
+        ("json decode (push)", push, "json_loads_object"),
+        ("payload processing", DrumFilterAPI, "process_payload"),
+        ("control command", DrumFilterAPI, "async_send_command"),
+    ]
+    for cls in vars(sensor).values():
+        if (
+            isinstance(cls, type)
+            and cls.__module__ == sensor.__name__
+            and "native_value" in vars(cls)
+        ):
+            paths.append((f"{cls.__name__}.native_value", cls, "native_value"))
+    return paths
+
+class DrumFilterProfiler:
+    """Time the integration's hot paths while a profile window is open."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the profiler."""
+        self.hass = hass
+        self.paths: dict[str, PathStats] = {}
+        self.loop_samples = 0
+        self.loop_lag_total = 0.0
+        self.loop_lag_max = 0.0
+        # 计时包装只在窗口期间安装，之后恢复原属性，未分析时没有开销
+        self._originals: list[tuple[type | ModuleType, str, Any]] = []
+        self._probe: asyncio.TimerHandle | None = None
+
+    async def async_run(self, duration: float) -> tuple[str, dict[str, Any]]:
+        """Profile for ``duration`` seconds, return the report path and a summary."""
+        profile = cProfile.Profile()
+        started = dt_util.utcnow()
+        try:
+            profile.enable()
+        except ValueError as err:
+            # 同一线程上已有其他分析器在运行（如 profiler 集成）
+            raise HomeAssistantError(f"Another profiler is running: {err}") from err
+
+        self._install()
+        self._schedule_probe()
+        _LOGGER.info("Profiling DrumFilter for %.0fs", duration)
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profile.disable()
+            if self._probe is not None:
+                self._probe.cancel()
+                self._probe = None
+            self._restore()
+
+        summary = self.summary()
+        report = self.hass.config.path(f"drumfilter_profile.{int(time())}.txt")
+        await self.hass.async_add_executor_job(
+            self._write_report, report, profile, started, duration
+        )
+        _LOGGER.info("DrumFilter profile written to %s", report)
+        return report, summary
+
+    def summary(self) -> dict[str, Any]:
+        """Return the path timings and the loop lag."""
+        return {
+            "paths": {
+                name: stats.as_dict()
+                for name, stats in self.paths.items()
+                if stats.calls
+            },
+            "loop_lag": {
+                "samples": self.loop_samples,
+                "mean_ms": round(
+                    self.loop_lag_total / self.loop_samples * 1000, 3
+                )
+                if self.loop_samples
+                else None,
+                "max_ms": round(self.loop_lag_max * 1000, 3),
+            },
+        }
+
+    def _install(self) -> None:
+        """Replace every profiled path with a timing wrapper."""
+        for name, owner, attribute in _profiled_paths():
+            original = vars(owner)[attribute]
+            stats = self.paths[name] = PathStats()
+            if isinstance(original, property):
+                wrapped: Any = property(_timed_function(original.fget, stats))
+            elif asyncio.iscoroutinefunction(original):
+                wrapped = _timed_coroutine_function(original, stats)
+            else:
+                wrapped = _timed_function(original, stats)
+            self._originals.append((owner, attribute, original))
+            setattr(owner, attribute, wrapped)
+
+    def _restore(self) -> None:
+        """Put the original paths back."""
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals.clear()
+
+    def _schedule_probe(self) -> None:
+        """Measure how late the loop runs a callback scheduled on time."""
+        loop = self.hass.loop
+        expected = loop.time() + LOOP_PROBE_INTERVAL
+
+        def _probe() -> None:
+            lag = max(loop.time() - expected, 0.0)
+            self.loop_samples += 1
+            self.loop_lag_total += lag
+            self.loop_lag_max = max(self.loop_lag_max, lag)
+            self._schedule_probe()
+
+        self._probe = loop.call_at(expected, _probe)
+
+    def _write_report(
+        self, report: str, profile: cProfile.Profile, started: datetime, duration: float
+    ) -> None:
+        """Write the text report and the raw cProfile data next to it."""
+        profile.dump_stats(f"{os.path.splitext(report)[0]}.cprof")
+
+        summary = self.summary()
+        lines = [
+            "DrumFilter profile",
+            f"Started: {started.isoformat()}",
+            f"Duration: {duration:.0f} s",
+            "",
+            f"Event loop lag, sampled every {LOOP_PROBE_INTERVAL} s:",
+            f"  samples {summary['loop_lag']['samples']}, "
+            f"mean {summary['loop_lag']['mean_ms']} ms, "
+            f"max {summary['loop_lag']['max_ms']} ms",
+            "",
+            "Code paths (blocking = time holding the event loop, inclusive of"
+            " nested paths):",
+            f"  {'path':<40}{'calls':>8}{'blocking ms':>14}"
+            f"{'max ms':>10}{'wall ms':>12}",
+        ]
+        for name, stats in sorted(
+            self.paths.items(), key=lambda item: item[1].blocking, reverse=True
+        ):
+            lines.append(
+                f"  {name:<40}{stats.calls:>8}{stats.blocking * 1000:>14.3f}"
+                f"{stats.blocking_max * 1000:>10.3f}{stats.wall * 1000:>12.3f}"
+            )
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        # 只列出集成自身的函数
+        stats.print_stats(re.escape(_PACKAGE_DIR), REPORT_MAX_FUNCTIONS)
+        lines += ["", "cProfile, DrumFilter functions only:", stream.getvalue()]
+
+        with open(report, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines))
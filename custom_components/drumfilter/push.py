@@ -0,0 +1,90 @@
+"""Push update channel for the DrumFilter integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from typing import TYPE_CHECKING
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.util.json import json_loads_object
+
+from .const import API_PUSH, PUSH_HEARTBEAT, PUSH_RECONNECT_MAX, PUSH_RECONNECT_MIN
+
+if TYPE_CHECKING:
+    from . import DrumFilterDataUpdateCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+class DrumFilterPushClient:
+    """Keep a WebSocket open and feed its messages to the coordinator."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: DrumFilterDataUpdateCoordinator,
+        websession: aiohttp.ClientSession,
+        url: str | None = None,
+    ) -> None:
+        """Initialize the push client."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.websession = websession
+        self.url = url or API_PUSH
+
+    async def async_run(self) -> None:
+        """Connect and reconnect until cancelled."""
+        # 连接期间协调器只做低频校验轮询，断开后立即恢复轮询并按指数退避重连
+        delay = PUSH_RECONNECT_MIN
+        try:
+            while True:
+                try:
+                    await self._async_listen()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                    _LOGGER.debug("Push channel error: %s", err)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Unexpected error in push channel")
+
+                if self.coordinator.push_connected:
+                    # 连接曾经建立成功，重置退避
+                    delay = PUSH_RECONNECT_MIN
+                self.coordinator.async_set_push_connected(False)
+
+                wait = delay * random.uniform(0.5, 1.5)
+                _LOGGER.debug("Reconnecting push channel in %.1fs", wait)
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, PUSH_RECONNECT_MAX)
+        finally:
+            # 任务被取消时也不能让协调器停留在推送模式
+            self.coordinator.async_set_push_connected(False)
+
+    async def _async_listen(self) -> None:
+        """Hold one WebSocket connection until it closes."""
+        async with self.websession.ws_connect(
+            self.url, heartbeat=PUSH_HEARTBEAT
+        ) as websocket:
+            await websocket.send_json(
+                {"action": "subscribe", "token": self.coordinator.api.token}
+            )
+            self.coordinator.async_set_push_connected(True)
+            _LOGGER.debug("Push channel connected to %s", self.url)
+
+            async for message in websocket:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    if message.type == aiohttp.WSMsgType.ERROR:
+                        raise websocket.exception() or aiohttp.ClientError()
+                    continue
+                try:
+                    data = json_loads_object(message.data)
+                except ValueError:
+                    _LOGGER.debug("Ignoring malformed push message")
+                    continue
+                try:
+                    self.coordinator.async_handle_push(data)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.warning(
+                        "Ignoring push message that could not be applied: %s",
+                        message.data,
+                        exc_info=True,
+                    )
@@ -0,0 +1,180 @@
+"""HTTP request helper for the DrumFilter cloud API."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import random
+from time import monotonic
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+from multidict import CIMultiDictProxy
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import SERVER_SOFTWARE
+from homeassistant.helpers.json import json_dumps
+from homeassistant.util import ssl as ssl_util
+
+from .breaker import CircuitBreaker
+from .const import (
+    POOL_DNS_CACHE_TTL,
+    POOL_KEEPALIVE_TIMEOUT,
+    POOL_LIMIT,
+    POOL_LIMIT_PER_HOST,
+    POOL_WAIT_WARNING,
+    REQUEST_RETRIES,
+    REQUEST_RETRY_DELAY,
+)
+from .exceptions import (
+    DrumFilterCircuitOpenError,
+    DrumFilterConnectionError,
+    DrumFilterTimeoutError,
+)
+from .metrics import DrumFilterMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=5)
+
+class RequestCounter:
+    """Upstream requests made on behalf of one poll cycle."""
+
+    __slots__ = ("count",)
+
+    def __init__(self) -> None:
+        """Initialize the counter."""
+        self.count = 0
+
+# 当前轮询周期的计数器，控制命令等其他请求不在该上下文中
+_request_counter: ContextVar[RequestCounter | None] = ContextVar(
+    "drumfilter_request_counter", default=None
+)
+
+def current_request_counter() -> RequestCounter | None:
+    """Return the counter of the poll cycle running in this context."""
+    return _request_counter.get()
+
+@contextmanager
+def count_requests() -> Iterator[RequestCounter]:
+    """Count every request attempt made in this context, retries included."""
+    counter = RequestCounter()
+    token = _request_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _request_counter.reset(token)
+
+def async_create_session(
+    hass: HomeAssistant, metrics: DrumFilterMetrics
+) -> aiohttp.ClientSession:
+    """Create the session used for all DrumFilter cloud requests."""
+    # 独立的连接池，云端变慢时不占用 HA 其他集成的连接；空闲连接保持、DNS 结果缓存
+    connector = aiohttp.TCPConnector(
+        limit=POOL_LIMIT,
+        limit_per_host=POOL_LIMIT_PER_HOST,
+        keepalive_timeout=POOL_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=POOL_DNS_CACHE_TTL,
+        enable_cleanup_closed=True,
+        ssl=ssl_util.get_default_context(),
+    )
+    trace = aiohttp.TraceConfig()
+
+    async def _on_queued_start(
+        _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+    ) -> None:
+        context.queued_at = monotonic()
+
+    async def _on_queued_end(
+        _session: aiohttp.ClientSession, context: SimpleNamespace, _params: Any
+    ) -> None:
+        waited = monotonic() - context.queued_at
+        metrics.record_pool_wait(waited)
+        if waited >= POOL_WAIT_WARNING:
+            _LOGGER.warning(
+                "DrumFilter connection pool saturated, request waited %.1fs "
+                "for a free connection",
+                waited,
+            )
+
+    async def _on_connection_create(
+        _session: aiohttp.ClientSession, _context: SimpleNamespace, _params: Any
+    ) -> None:
+        metrics.record_connection(reused=False)
+
+    async def _on_connection_reuse(
+        _session: aiohttp.ClientSession, _context: SimpleNamespace, _params: Any
+    ) -> None:
+        metrics.record_connection(reused=True)
+
+    trace.on_connection_queued_start.append(_on_queued_start)
+    trace.on_connection_queued_end.append(_on_queued_end)
+    trace.on_connection_create_end.append(_on_connection_create)
+    trace.on_connection_reuseconn.append(_on_connection_reuse)
+
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=REQUEST_TIMEOUT,
+        headers={"User-Agent": SERVER_SOFTWARE},
+        json_serialize=json_dumps,
+        trace_configs=[trace],
+    )
+
+async def async_post(
+    websession: aiohttp.ClientSession,
+    breaker: CircuitBreaker,
+    url: str,
+    payload: dict[str, Any],
+    metrics: DrumFilterMetrics | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: aiohttp.ClientTimeout = REQUEST_TIMEOUT,
+    retries: int = REQUEST_RETRIES,
+) -> tuple[int, bytes, CIMultiDictProxy[str]]:
+    """POST a JSON payload and return the status, raw body and headers."""
+    # 连接错误、超时和 5xx 计入断路器并按指数退避重试，其他状态码原样返回
+    error: DrumFilterConnectionError | None = None
+    for attempt in range(retries + 1):
+        if not breaker.allow_request():
+            if error is not None:
+                raise error
+            raise DrumFilterCircuitOpenError(breaker.retry_in)
+
+        if (counter := _request_counter.get()) is not None:
+            counter.count += 1
+        start = monotonic()
+        try:
+            async with websession.post(
+                url,
+                json=payload,
+                headers={"Content-Type": "application/json", **(headers or {})},
+                timeout=timeout,
+            ) as response:
+                body = await response.read()
+        except asyncio.TimeoutError:
+            error = DrumFilterTimeoutError("Timeout talking to DrumFilter API")
+            kind = "timeout"
+        except aiohttp.ClientError as err:
+            error = DrumFilterConnectionError(f"Cannot connect to DrumFilter API: {err}")
+            kind = type(err).__name__
+        else:
+            if metrics is not None:
+                metrics.record_request(monotonic() - start, len(body))
+            if response.status < 500:
+                breaker.record_success()
+                return response.status, body, response.headers
+            error = DrumFilterConnectionError(f"HTTP error: {response.status}")
+            kind = f"http_{response.status}"
+
+        if metrics is not None:
+            metrics.record_error(kind)
+
+        breaker.record_failure()
+        if attempt < retries:
+            delay = REQUEST_RETRY_DELAY * 2**attempt * random.uniform(0.5, 1.5)
+            _LOGGER.debug("%s, retrying in %.1fs", error, delay)
+            await asyncio.sleep(delay)
+
+    raise error
@@ -9,7 +9,9 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .commands import CommandResult
 from .const import DOMAIN
+from .entity import async_add_device_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,32 +25,40 @@ async def async_setup_entry(
     
     data = hass.data[DOMAIN][entry.entry_id]
     api = data["api"]
+    coordinator = data["coordinator"]
+    commands = data["commands"]
     
-    scenes = [
-        DrumFilterCleanScene(api),
-    ]
-    
-    async_add_entities(scenes)
+    def _scenes(uid: str) -> list[Scene]:
+        return [DrumFilterCleanScene(coordinator, api, uid, commands[uid])]
+
+    async_add_device_entities(entry, coordinator, async_add_entities, _scenes)
     _LOGGER.debug("DrumFilter scene setup completed")
 
 class DrumFilterCleanScene(Scene):
     """Representation of a DrumFilter clean scene."""
 
-    def __init__(self, api) -> None:
+    def __init__(self, coordinator, api, uid: str, commands) -> None:
         """Initialize the scene."""
+        self._coordinator = coordinator
         self._api = api
+        self._uid = uid
+        self._commands = commands
         self._attr_name = "立即清洗"
-        self._attr_unique_id = f"{api.device_identifier}_clean_scene"
+        self._attr_unique_id = f"{uid}_clean_scene"
         self._attr_icon = "mdi:broom"
-        self._attr_device_info = api.get_device_info()
+        self._attr_device_info = api.devices[uid].get_device_info()
 
     async def async_activate(self, **kwargs: Any) -> None:
         """Activate the scene."""
         try:
             _LOGGER.debug("Sending clean command via scene")
-            success = await self._api.async_control_device(clean=True)
-            if success:
+            result = await self._commands.async_send(clean=True)
+            if result is CommandResult.SENT:
+                # 清洗记录出现前保持快速轮询
+                self._coordinator.async_boost(self._uid, clean=True)
                 _LOGGER.info("清洗命令发送成功")
+            elif result is CommandResult.QUEUED:
+                _LOGGER.info("设备暂时无法连接，清洗命令将在恢复后发送")
             else:
                 _LOGGER.error("发送清洗命令失败")
         except Exception as err:
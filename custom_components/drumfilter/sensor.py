@@ -1,20 +1,48 @@
 """Sensor platform for DrumFilter integration."""
 from __future__ import annotations
 
+from datetime import datetime, timedelta
 import logging
 from typing import Any
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, CLEAN_REASON_MAP, NETWORK_STATUS_MAP
+from .const import DOMAIN, DATA_FLEET, CLEAN_REASON_MAP, METRICS_UPDATE_INTERVAL
+from .entity import DrumFilterEntity, async_add_device_entities
 
 _LOGGER = logging.getLogger(__name__)
 
+async def async_setup_platform(
+    hass: HomeAssistant,
+    config: ConfigType,
+    async_add_entities: AddEntitiesCallback,
+    discovery_info: DiscoveryInfoType | None = None,
+) -> None:
+    """Set up the fleet sensors shared by all config entries."""
+    if discovery_info is None:
+        return
+
+    fleet = hass.data[DOMAIN][DATA_FLEET]
+    async_add_entities(
+        [
+            DrumFilterFleetSensor(fleet, "online", "在线设备数", "mdi:lan-connect"),
+            DrumFilterFleetSensor(fleet, "offline", "离线设备数", "mdi:lan-disconnect"),
+            DrumFilterFleetSensor(fleet, "cleans_24h", "24小时清洗总次数", "mdi:calendar-today"),
+            DrumFilterFleetSensor(fleet, "oldest_clean", "最久未清洗", "mdi:calendar-alert"),
+        ]
+    )
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -27,74 +55,287 @@ async def async_setup_entry(
     api = data["api"]
     coordinator = data["coordinator"]
     
-    sensors = [
-        # 移除名称传感器，因为有可编辑的文本实体了
-        # DrumFilterSensor(coordinator, api, "name", "设备名称", "mdi:rename-box"),
-        DrumFilterSensor(coordinator, api, "network", "网络状态", "mdi:network"),
-        DrumFilterSensor(coordinator, api, "last_record", "最近清洗", "mdi:history"),
-    ]
-    
-    async_add_entities(sensors)
+    def _sensors(uid: str) -> list[SensorEntity]:
+        return [
+            # 移除名称传感器，因为有可编辑的文本实体了
+            # DrumFilterSensor(coordinator, api, uid, "name", "设备名称", "mdi:rename-box"),
+            DrumFilterSensor(coordinator, api, uid, "network", "网络状态", "mdi:network"),
+            DrumFilterSensor(coordinator, api, uid, "last_record", "最近清洗", "mdi:history"),
+            DrumFilterSensor(coordinator, api, uid, "next_clean", "预计下次清洗", "mdi:calendar-clock"),
+            DrumFilterStatisticsSensor(coordinator, api, uid, "total_records", "清洗总次数", "mdi:counter"),
+            DrumFilterStatisticsSensor(coordinator, api, uid, "cleans_24h", "24小时清洗次数", "mdi:calendar-today"),
+            DrumFilterStatisticsSensor(coordinator, api, uid, "mean_interval", "平均清洗间隔", "mdi:timer-sand"),
+            DrumFilterStatisticsSensor(coordinator, api, uid, "trigger_rate", "水位触发比例", "mdi:waves-arrow-up"),
+            DrumFilterDiagnosticSensor(coordinator, api, uid, "latency", "Token 接口平均延迟", "mdi:timer-outline"),
+            DrumFilterDiagnosticSensor(coordinator, api, uid, "errors", "Token 接口错误次数", "mdi:alert-circle-outline"),
+        ]
+
+    async_add_device_entities(entry, coordinator, async_add_entities, _sensors)
     _LOGGER.debug("DrumFilter sensors setup completed")
 
-class DrumFilterSensor(CoordinatorEntity, SensorEntity):
+class DrumFilterSensor(DrumFilterEntity, SensorEntity):
     """Representation of a DrumFilter sensor."""
 
-    def __init__(self, coordinator, api, sensor_type: str, sensor_name: str, icon: str) -> None:
+    def __init__(self, coordinator, api, uid: str, sensor_type: str, sensor_name: str, icon: str) -> None:
         """Initialize the sensor."""
-        super().__init__(coordinator)
-        self._api = api
+        super().__init__(coordinator, api, uid)
         self._sensor_type = sensor_type
         self._attr_name = sensor_name
-        self._attr_unique_id = f"{api.device_identifier}_{sensor_type}"
+        self._attr_unique_id = f"{uid}_{sensor_type}"
         self._attr_icon = icon
-        self._attr_device_info = api.get_device_info()
+        if sensor_type == "network":
+            self._fields = frozenset({"network"})
+        elif sensor_type == "next_clean":
+            # 由最近清洗时间和清洗间隔在本地推算
+            self._fields = frozenset({"last_record_time", "interval"})
+            self._attr_device_class = SensorDeviceClass.TIMESTAMP
+        else:
+            self._fields = frozenset({"last_record_time", "last_record_reason"})
+
+    async def async_added_to_hass(self) -> None:
+        """Also write state when the breaker or the transport changes."""
+        await super().async_added_to_hass()
+        if self._sensor_type == "network":
+            # 熔断期间没有成功的轮询，属性只能由熔断器和通道的变化来刷新
+            self.async_on_remove(self._api.breaker.add_listener(self.async_write_ha_state))
+            self.async_on_remove(
+                self._api.async_add_transport_listener(self.async_write_ha_state)
+            )
 
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        if not self.coordinator.data:
+        snapshot = self.snapshot
+        if snapshot is None:
             return None
-            
-        device_info = self._api.device_info
         
         if self._sensor_type == "network":
-            network_status = device_info.get("network", "unknown")
-            return NETWORK_STATUS_MAP.get(network_status, network_status)
+            return snapshot.network_label
                 
         elif self._sensor_type == "last_record":
-            last_record = device_info.get("last_record")
-            if not last_record:
-                return "暂无记录"
-                
-            timestamp = last_record.get("time")
-            reason = last_record.get("reason", "unknown")
-            
-            if not timestamp:
-                return f"时间未知 ({CLEAN_REASON_MAP.get(reason, reason)})"
-            
-            record_time = dt_util.utc_from_timestamp(timestamp)
-            local_time = dt_util.as_local(record_time)
-            time_str = local_time.strftime("%m-%d %H:%M")
-            reason_text = CLEAN_REASON_MAP.get(reason, reason)
-            
-            return f"{time_str} {reason_text}"
+            return snapshot.last_record_text
+
+        elif self._sensor_type == "next_clean":
+            if (next_clean := snapshot.next_clean_time) is None:
+                return None
+            return dt_util.utc_from_timestamp(next_clean)
         
         return None
 
     @property
     def extra_state_attributes(self):
         """Return additional attributes for the sensor."""
-        if self._sensor_type != "last_record" or not self.coordinator.data:
+        if self._sensor_type == "network":
+            # 诊断用：云端接口熔断器状态和最近一次请求走的通道
+            return {
+                "circuit_breaker": self._api.breaker.state,
+                "transport": self._api.last_transport,
+            }
+
+        snapshot = self.snapshot
+        if self._sensor_type != "last_record" or snapshot is None:
             return None
-            
-        device_info = self._api.device_info
-        last_record = device_info.get("last_record")
         
-        if not last_record:
+        if snapshot.last_record_reason is None:
             return None
             
         return {
-            "Reason": last_record.get("reason", "unknown"),
-            "Timestamp": last_record.get("time"),
-        }
\ No newline at end of file
+            "Reason": snapshot.last_record_reason,
+            "Timestamp": snapshot.last_record_time,
+        }
+
+class DrumFilterStatisticsSensor(DrumFilterEntity, SensorEntity):
+    """Cleaning statistics derived from the local history."""
+
+    def __init__(self, coordinator, api, uid: str, sensor_type: str, sensor_name: str, icon: str) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, api, uid)
+        self._sensor_type = sensor_type
+        self._attr_name = sensor_name
+        self._attr_unique_id = f"{uid}_{sensor_type}"
+        self._attr_icon = icon
+        # 统计值只会在有新记录时变化
+        self._fields = frozenset({"last_record_time", "total_records"})
+
+        # 设置 state_class 后由 HA 自动生成长期统计
+        if sensor_type == "total_records":
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        else:
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        if sensor_type == "cleans_24h":
+            self._attr_native_unit_of_measurement = "次"
+        elif sensor_type == "mean_interval":
+            self._attr_native_unit_of_measurement = "分钟"
+        elif sensor_type == "trigger_rate":
+            self._attr_native_unit_of_measurement = "%"
+
+    async def async_added_to_hass(self) -> None:
+        """Also write state when a clean drops out of the 24 hour window."""
+        await super().async_added_to_hass()
+        if self._sensor_type == "cleans_24h":
+            # 没有新记录时计数也会随时间减少
+            self.async_on_remove(
+                self.coordinator.histories[self._uid].async_add_listener(
+                    self.async_write_ha_state
+                )
+            )
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        if (snapshot := self.snapshot) is None:
+            return None
+
+        history = self.coordinator.histories[self._uid]
+        if self._sensor_type == "total_records":
+            return snapshot.total_records
+        if self._sensor_type == "cleans_24h":
+            return history.cleans_last_24h
+        if self._sensor_type == "mean_interval":
+            return history.mean_interval
+        if self._sensor_type == "trigger_rate":
+            return history.trigger_rate
+        return None
+
+    @property
+    def extra_state_attributes(self):
+        """Return clean counts by reason."""
+        if self._sensor_type != "total_records" or self.snapshot is None:
+            return None
+
+        return {
+            CLEAN_REASON_MAP.get(reason, reason): count
+            for reason, count in self.coordinator.histories[self._uid].by_reason.items()
+        }
+
+class DrumFilterDiagnosticSensor(DrumFilterEntity, SensorEntity):
+    """Upstream API metrics of the token, shared by all of its devices."""
+
+    def __init__(self, coordinator, api, uid: str, sensor_type: str, sensor_name: str, icon: str) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, api, uid)
+        self._sensor_type = sensor_type
+        self._attr_name = sensor_name
+        self._attr_unique_id = f"{uid}_{sensor_type}"
+        self._attr_icon = icon
+
+        # 诊断实体默认禁用，需要时在实体设置中启用
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_entity_registry_enabled_default = False
+        if sensor_type == "latency":
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+            self._attr_native_unit_of_measurement = "ms"
+        else:
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        self._last_state: tuple[Any, Any] | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Also refresh on a timer, polls stop arriving while the cloud is down."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_refresh_metrics,
+                timedelta(seconds=METRICS_UPDATE_INTERVAL),
+            )
+        )
+
+    @callback
+    def _async_refresh_metrics(self, _now: datetime) -> None:
+        """Write the metrics if they changed since the last write."""
+        self._handle_coordinator_update()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if the metrics changed."""
+        state = (self.native_value, self.extra_state_attributes)
+        if state == self._last_state:
+            return
+        self._last_state = state
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Metrics stay readable while the cloud is down."""
+        return True
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        metrics = self._api.metrics
+        if self._sensor_type == "latency":
+            mean = metrics.latency_mean
+            return round(mean * 1000, 1) if mean is not None else None
+        if self._sensor_type == "errors":
+            return sum(metrics.errors.values())
+        return None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the detailed metrics."""
+        if self._sensor_type == "latency":
+            metrics = self._api.metrics.as_dict()
+            return {
+                "latency_max_ms": metrics["latency_max_ms"],
+                "latency_histogram": metrics["latency_histogram"],
+                "bytes_received": metrics["bytes_received"],
+                "polls_unchanged": metrics["polls_unchanged"],
+            }
+        return dict(self._api.metrics.errors)
+
+class DrumFilterFleetSensor(SensorEntity):
+    """Aggregate over every DrumFilter device, read from the fleet index."""
+
+    _attr_should_poll = False
+
+    def __init__(self, fleet, sensor_type: str, sensor_name: str, icon: str) -> None:
+        """Initialize the sensor."""
+        self._fleet = fleet
+        self._sensor_type = sensor_type
+        self._attr_name = f"DrumFilter {sensor_name}"
+        self._attr_unique_id = f"{DOMAIN}_fleet_{sensor_type}"
+        self._attr_icon = icon
+        if sensor_type == "oldest_clean":
+            self._attr_device_class = SensorDeviceClass.TIMESTAMP
+        else:
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+            self._attr_native_unit_of_measurement = "台" if sensor_type != "cleans_24h" else "次"
+        self._last_state: tuple[Any, Any] | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the fleet index."""
+        self.async_on_remove(self._fleet.async_add_listener(self._handle_fleet_update))
+
+    @callback
+    def _handle_fleet_update(self) -> None:
+        """Write state only if this aggregate changed."""
+        state = (self.native_value, self.extra_state_attributes)
+        if state == self._last_state:
+            return
+        self._last_state = state
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        """Return the aggregate."""
+        fleet = self._fleet
+        if self._sensor_type == "online":
+            return fleet.network_counts["online"]
+        if self._sensor_type == "offline":
+            return fleet.device_count - fleet.network_counts["online"]
+        if self._sensor_type == "cleans_24h":
+            return fleet.cleans_last_24h
+        if self._sensor_type == "oldest_clean":
+            if (oldest := fleet.oldest_clean) is None:
+                return None
+            return dt_util.utc_from_timestamp(oldest[0])
+        return None
+
+    @property
+    def extra_state_attributes(self):
+        """Return the device behind the oldest last clean."""
+        if self._sensor_type == "oldest_clean" and (oldest := self._fleet.oldest_clean):
+            return {"uid": oldest[1]}
+        if self._sensor_type in ("online", "offline"):
+            return {"total": self._fleet.device_count}
+        return None
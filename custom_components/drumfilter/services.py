@@ -0,0 +1,181 @@
+"""Services for the DrumFilter integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_ENTITY_ID, ENTITY_MATCH_ALL
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+
+from .commands import CommandResult
+from .const import (
+    ATTR_DURATION,
+    ATTR_INTERVAL,
+    DATA_PROFILER,
+    DEFAULT_PROFILE_DURATION,
+    DOMAIN,
+    MAX_INTERVAL,
+    MAX_PROFILE_DURATION,
+    MIN_INTERVAL,
+    SERVICE_CLEAN,
+    SERVICE_PROFILE,
+    SERVICE_SET_INTERVAL,
+)
+from .profiler import DrumFilterProfiler
+
+_LOGGER = logging.getLogger(__name__)
+
+CLEAN_SCHEMA = vol.Schema({**cv.TARGET_SERVICE_FIELDS})
+SET_INTERVAL_SCHEMA = vol.Schema(
+    {
+        **cv.TARGET_SERVICE_FIELDS,
+        vol.Required(ATTR_INTERVAL): vol.All(
+            vol.Coerce(int), vol.Range(min=MIN_INTERVAL, max=MAX_INTERVAL)
+        ),
+    }
+)
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=MAX_PROFILE_DURATION)
+        ),
+    }
+)
+
+def _async_targets(
+    hass: HomeAssistant, call: ServiceCall
+) -> list[tuple[dict[str, Any], str]]:
+    """Return the entry runtime data and ``uid`` of every targeted device."""
+    loaded = hass.data.get(DOMAIN, {})
+    devices = [
+        (data, uid)
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if (data := loaded.get(entry.entry_id)) is not None
+        for uid in data["coordinator"].data
+    ]
+    # 不带目标的调用直接拒绝，entity_id: all 才表示全部设备
+    if call.data.get(ATTR_ENTITY_ID) == ENTITY_MATCH_ALL:
+        return devices
+    if not any(call.data.get(str(key)) for key in cv.TARGET_SERVICE_FIELDS):
+        raise ServiceValidationError(
+            f"{DOMAIN}.{call.service} needs a target, use entity_id: all for every device",
+            translation_domain=DOMAIN,
+            translation_key="no_target",
+            translation_placeholders={"service": f"{DOMAIN}.{call.service}"},
+        )
+
+    # 实体和区域都解析到设备，再由设备标识找到 uid
+    selected = async_extract_referenced_entity_ids(hass, call)
+    entity_registry = er.async_get(hass)
+    device_ids = set(selected.referenced_devices)
+    for entity_id in selected.referenced | selected.indirectly_referenced:
+        if (entity := entity_registry.async_get(entity_id)) and entity.device_id:
+            device_ids.add(entity.device_id)
+
+    device_registry = dr.async_get(hass)
+    uids = {
+        identifier[1]
+        for device_id in device_ids
+        if (device := device_registry.async_get(device_id))
+        for identifier in device.identifiers
+        if identifier[0] == DOMAIN
+    }
+    return [(data, uid) for data, uid in devices if uid in uids]
+
+async def _async_fan_out(
+    hass: HomeAssistant, call: ServiceCall, **command: Any
+) -> ServiceResponse:
+    """Send one control command to every targeted device concurrently."""
+    targets = _async_targets(hass, call)
+
+    async def _async_send(data: dict[str, Any], uid: str) -> CommandResult:
+        coordinator = data["coordinator"]
+        if ATTR_INTERVAL in command:
+            coordinator.async_set_optimistic(uid, interval=command[ATTR_INTERVAL])
+        # 经过命令队列发送，设备离线时命令会保存到恢复后重发；并发数在发送时由 hub 限制
+        result = await data["commands"][uid].async_send(**command)
+        if result is not CommandResult.SENT:
+            coordinator.async_discard_optimistic(uid, ATTR_INTERVAL)
+        elif command.get("clean"):
+            coordinator.async_boost(uid, clean=True)
+        else:
+            coordinator.async_request_confirm()
+        return result
+
+    _LOGGER.debug("Sending %s to %s device(s)", call.service, len(targets))
+    results = await asyncio.gather(*(_async_send(data, uid) for data, uid in targets))
+
+    failed = results.count(CommandResult.FAILED)
+    if failed:
+        _LOGGER.warning("%s failed on %s of %s device(s)", call.service, failed, len(targets))
+
+    if not call.return_response:
+        return None
+    return {
+        "results": {
+            uid: {
+                "name": data["coordinator"].data[uid].name,
+                "success": result is CommandResult.SENT,
+                "queued": result is CommandResult.QUEUED,
+            }
+            for (data, uid), result in zip(targets, results)
+        }
+    }
+
+async def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the DrumFilter services."""
+
+    async def async_clean(call: ServiceCall) -> ServiceResponse:
+        """Start a clean on the targeted devices."""
+        return await _async_fan_out(hass, call, clean=True)
+
+    async def async_set_interval(call: ServiceCall) -> ServiceResponse:
+        """Set the cleaning interval on the targeted devices."""
+        return await _async_fan_out(hass, call, interval=call.data[ATTR_INTERVAL])
+
+    async def async_profile(call: ServiceCall) -> ServiceResponse:
+        """Profile the integration and write a report to the config dir."""
+        domain_data = hass.data.setdefault(DOMAIN, {})
+        if DATA_PROFILER in domain_data:
+            raise HomeAssistantError(
+                "A DrumFilter profile is already running",
+                translation_domain=DOMAIN,
+                translation_key="profile_running",
+            )
+        profiler = domain_data[DATA_PROFILER] = DrumFilterProfiler(hass)
+        try:
+            report, summary = await profiler.async_run(call.data[ATTR_DURATION])
+        finally:
+            domain_data.pop(DATA_PROFILER, None)
+        if not call.return_response:
+            return None
+        return {"report": report, **summary}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CLEAN,
+        async_clean,
+        schema=CLEAN_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_INTERVAL,
+        async_set_interval,
+        schema=SET_INTERVAL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -10,7 +10,9 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.entity import EntityCategory
 
+from .commands import CommandResult
 from .const import DOMAIN
+from .entity import DrumFilterEntity, async_add_device_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,24 +26,27 @@ async def async_setup_entry(
     
     data = hass.data[DOMAIN][entry.entry_id]
     api = data["api"]
+    coordinator = data["coordinator"]
+    commands = data["commands"]
     
-    texts = [
-        DrumFilterNameText(api),
-    ]
-    
-    async_add_entities(texts, True)
+    def _texts(uid: str) -> list[TextEntity]:
+        return [DrumFilterNameText(coordinator, api, uid, commands[uid])]
+
+    async_add_device_entities(entry, coordinator, async_add_entities, _texts)
     _LOGGER.debug("DrumFilter text setup completed")
 
-class DrumFilterNameText(TextEntity):
+class DrumFilterNameText(DrumFilterEntity, TextEntity):
     """Representation of a DrumFilter name text entity."""
 
-    def __init__(self, api) -> None:
+    _fields = frozenset({"name"})
+
+    def __init__(self, coordinator, api, uid: str, commands) -> None:
         """Initialize the text entity."""
-        self._api = api
+        super().__init__(coordinator, api, uid)
+        self._commands = commands
         self._attr_name = "设备名称"
-        self._attr_unique_id = f"{api.device_identifier}_name"
+        self._attr_unique_id = f"{uid}_name"
         self._attr_icon = "mdi:rename-box"
-        self._attr_device_info = api.get_device_info()
         
         # 文本实体属性
         self._attr_native_max_length = 50  # 最大长度
@@ -51,25 +56,29 @@ class DrumFilterNameText(TextEntity):
         # 设置为配置类别，隐藏于首页，显示在设置中
         self._attr_entity_category = EntityCategory.CONFIG
 
-    async def async_update(self) -> None:
-        """Fetch new state data for the text entity."""
-        try:
-            await self._api.async_get_data()
-            self._attr_native_value = self._api.device_info.get("name", "Unknown Device")
-        except Exception as err:
-            _LOGGER.error("Error updating name text: %s", err)
-            self._attr_native_value = "Unknown Device"
+    @property
+    def native_value(self) -> str | None:
+        """Return the current device name from the coordinator data."""
+        if (snapshot := self.snapshot) is None:
+            return None
+        return snapshot.name
 
     async def async_set_value(self, value: str) -> None:
         """Update the current value."""
         try:
             _LOGGER.debug("Setting device name to: %s", value)
-            success = await self._api.async_control_device(name=value)
-            if success:
-                self._attr_native_value = value
-                self.async_write_ha_state()
+            # 先显示新值，下一次轮询确认或回滚
+            self.coordinator.async_set_optimistic(self._uid, name=value)
+            result = await self._commands.async_send(name=value)
+            if result is CommandResult.SENT:
+                self.coordinator.async_request_confirm()
                 _LOGGER.info("Device name updated to: %s", value)
+            elif result is CommandResult.QUEUED:
+                # 设备恢复在线后重发，期间显示设备当前的值
+                self.coordinator.async_discard_optimistic(self._uid, "name")
             else:
+                self.coordinator.async_discard_optimistic(self._uid, "name")
                 _LOGGER.error("Failed to set device name")
         except Exception as err:
-            _LOGGER.error("Error setting device name: %s", err)
\ No newline at end of file
+            self.coordinator.async_discard_optimistic(self._uid, "name")
+            _LOGGER.error("Error setting device name: %s", err)
@@ -0,0 +1,211 @@
+"""Transports carrying DrumFilter queries and commands."""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import secrets
+from typing import Any
+
+import aiohttp
+from multidict import CIMultiDictProxy
+
+from .breaker import CircuitBreaker
+from .const import (
+    API_CONTROL,
+    API_QUERY,
+    LOCAL_REQUEST_TIMEOUT,
+    LOCAL_RETRY_COOLDOWN,
+    REQUEST_RETRIES,
+)
+from homeassistant.util.json import json_loads_object
+
+from .exceptions import DrumFilterConnectionError, DrumFilterTimeoutError
+from .metrics import DrumFilterMetrics
+from .request import REQUEST_TIMEOUT, async_post
+
+_LOGGER = logging.getLogger(__name__)
+
+LOCAL_TIMEOUT = aiohttp.ClientTimeout(total=LOCAL_REQUEST_TIMEOUT, connect=1)
+
+TRANSPORT_CLOUD = "cloud"
+TRANSPORT_LOCAL = "local"
+
+class DrumFilterTransport:
+    """One way of reaching a device: the cloud API or the device itself."""
+
+    def __init__(
+        self,
+        name: str,
+        websession: aiohttp.ClientSession,
+        breaker: CircuitBreaker,
+        query_url: str,
+        control_url: str,
+        timeout: aiohttp.ClientTimeout = REQUEST_TIMEOUT,
+        retries: int = REQUEST_RETRIES,
+        strict: bool = False,
+        challenge_url: str | None = None,
+    ) -> None:
+        """Initialize the transport."""
+        self.name = name
+        self.websession = websession
+        # 每种传输方式有自己的断路器，设备离开局域网不影响云端
+        self.breaker = breaker
+        self.query_url = query_url
+        self.control_url = control_url
+        self.timeout = timeout
+        self.retries = retries
+        # 严格模式下任何意外状态码都视为连接错误，以便回退
+        self.strict = strict
+        # 有质询地址的传输方式在对方证明已知 Token 后才发送 Token
+        self.challenge_url = challenge_url
+        self.verified = challenge_url is None
+
+    @classmethod
+    def cloud(
+        cls, websession: aiohttp.ClientSession, breaker: CircuitBreaker
+    ) -> DrumFilterTransport:
+        """Return the transport for the cloud API."""
+        return cls(TRANSPORT_CLOUD, websession, breaker, API_QUERY, API_CONTROL)
+
+    @classmethod
+    def local(
+        cls, websession: aiohttp.ClientSession, host: str, port: int
+    ) -> DrumFilterTransport:
+        """Return the transport for a device on the local network."""
+        # 一次失败即回退到云端直到冷却结束，不重试，设备离线最多耗费一次短超时；
+        # 地址通常来自未认证的 mDNS，发送 Token 前先质询
+        base_url = f"http://{host}:{port}/api"
+        return cls(
+            TRANSPORT_LOCAL,
+            websession,
+            CircuitBreaker(
+                failure_threshold=1,
+                base_cooldown=LOCAL_RETRY_COOLDOWN,
+                name=f"DrumFilter local API at {host}",
+            ),
+            f"{base_url}/querybytoken",
+            f"{base_url}/control",
+            timeout=LOCAL_TIMEOUT,
+            retries=0,
+            strict=True,
+            challenge_url=f"{base_url}/challenge",
+        )
+
+    async def async_verify(self, token: str) -> None:
+        """Make sure the other end knows ``token`` without sending it."""
+        # 对方需返回以 Token 为密钥的随机数 HMAC，失败时抛出连接错误以回退到云端
+        if self.verified:
+            return
+        nonce = secrets.token_hex(16)
+        try:
+            status, body, _ = await async_post(
+                self.websession,
+                self.breaker,
+                self.challenge_url,
+                {"nonce": nonce},
+                timeout=self.timeout,
+                retries=0,
+            )
+        except DrumFilterTimeoutError as err:
+            # 质询不携带命令，超时后可以安全地回退
+            raise DrumFilterConnectionError(str(err)) from err
+        expected = hmac.new(token.encode(), nonce.encode(), hashlib.sha256).hexdigest()
+        try:
+            proof = json_loads_object(body).get("proof") if status == 200 else None
+        except ValueError:
+            proof = None
+        if not isinstance(proof, str) or not hmac.compare_digest(proof.encode(), expected.encode()):
+            _LOGGER.warning(
+                "%s failed the identity check, not sending it the token",
+                self.breaker.name,
+            )
+            self.breaker.record_failure()
+            raise DrumFilterConnectionError(f"{self.name} transport failed verification")
+        self.verified = True
+
+    async def async_query(
+        self,
+        payload: dict[str, Any],
+        metrics: DrumFilterMetrics,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, bytes, CIMultiDictProxy[str]]:
+        """Send a query."""
+        await self.async_verify(payload["token"])
+        try:
+            response = await async_post(
+                self.websession,
+                self.breaker,
+                self.query_url,
+                payload,
+                metrics,
+                headers,
+                self.timeout,
+                self.retries,
+            )
+            self._check_status(response[0], (200, 304))
+        except DrumFilterConnectionError:
+            self._forget_verification()
+            raise
+        return response
+
+    async def async_control(
+        self, payload: dict[str, Any], metrics: DrumFilterMetrics
+    ) -> int:
+        """Send a control command and return the HTTP status."""
+        # 控制命令不自动重试，超时的命令可能已被执行
+        await self.async_verify(payload["token"])
+        try:
+            status, _, _ = await async_post(
+                self.websession,
+                self.breaker,
+                self.control_url,
+                payload,
+                metrics,
+                timeout=self.timeout,
+                retries=0,
+            )
+            self._check_status(status, (200,))
+        except DrumFilterConnectionError:
+            self._forget_verification()
+            raise
+        return status
+
+    def _forget_verification(self) -> None:
+        """Challenge the device again after it went away."""
+        # 设备掉线后地址可能被分配给其他主机
+        if self.challenge_url is not None:
+            self.verified = False
+
+    def _check_status(self, status: int, expected: tuple[int, ...]) -> None:
+        """Fail over on an unexpected status if the transport is strict."""
+        if self.strict and status not in expected:
+            self.breaker.record_failure()
+            raise DrumFilterConnectionError(
+                f"{self.name} transport returned HTTP {status}"
+            )
+
+async def async_request(
+    transports: list[DrumFilterTransport],
+    method: str,
+    *args: Any,
+    fallback_on_timeout: bool = True,
+    **kwargs: Any,
+) -> tuple[DrumFilterTransport, Any]:
+    """Call ``method`` on the first transport that succeeds, falling back in order."""
+    # 连接错误换下一个传输方式，全部失败时抛出最后一个错误
+    for index, transport in enumerate(transports):
+        try:
+            return transport, await getattr(transport, method)(*args, **kwargs)
+        except DrumFilterConnectionError as err:
+            if index == len(transports) - 1 or (
+                isinstance(err, DrumFilterTimeoutError) and not fallback_on_timeout
+            ):
+                raise
+            _LOGGER.debug(
+                "%s transport failed (%s), falling back to %s",
+                transport.name,
+                err,
+                transports[index + 1].name,
+            )
+    raise DrumFilterConnectionError("No transport available")
@@ -0,0 +1,69 @@
+"""Helpers shared by the DrumFilter tests and benchmarks."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import time
+from typing import Any
+
+from homeassistant import bootstrap, config_entries, core, loader
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.drumfilter import hub as hub_module
+from custom_components.drumfilter import push as push_module
+from custom_components.drumfilter import transport as transport_module
+from custom_components.drumfilter.const import DOMAIN
+
+class Clock:
+    """Wall clock that a test can move forward."""
+
+    def __init__(self) -> None:
+        """Start at the real time."""
+        self.offset = 0.0
+
+    def __call__(self) -> float:
+        """Return the shifted time."""
+        return time.time() + self.offset
+
+async def async_start_hass(config_dir: str) -> HomeAssistant:
+    """Start a bare Home Assistant instance with config entry support."""
+    hass = core.HomeAssistant(config_dir)
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    if hasattr(bootstrap, "async_load_base_functionality"):
+        # 2024.3 起注册表与配置条目一起加载
+        await bootstrap.async_load_base_functionality(hass)
+    else:
+        await hass.config_entries.async_initialize()
+        await bootstrap.load_registries(hass)
+    await hass.async_start()
+    return hass
+
+def point_at(base_url: str) -> None:
+    """Send all integration traffic to the fake cloud at ``base_url``."""
+    transport_module.API_QUERY = f"{base_url}/querybytoken"
+    transport_module.API_CONTROL = f"{base_url}/control"
+    hub_module.API_QUERY_BATCH = f"{base_url}/querybytokens"
+    push_module.API_PUSH = f"ws{base_url.removeprefix('http')}/ws"
+
+async def async_add_entry(
+    hass: HomeAssistant, token: str, options: dict[str, Any] | None = None
+) -> ConfigEntry:
+    """Add an entry for ``token`` through the user flow and wait for setup."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": "user"}, data={"token": token}
+    )
+    entry = result["result"]
+    await hass.async_block_till_done()
+    if options:
+        # 选项变化会重新加载条目
+        hass.config_entries.async_update_entry(entry, options=options)
+        await hass.async_block_till_done()
+    return entry
+
+async def async_wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    """Wait until ``condition`` holds, failing after ``timeout`` seconds."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
@@ -0,0 +1,67 @@
+"""Fixtures for the DrumFilter tests."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+import inspect
+
+from homeassistant.core import HomeAssistant
+import pytest
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter import fleet as fleet_module
+from custom_components.drumfilter import history as history_module
+
+from .common import Clock, async_start_hass, point_at
+
+@pytest.fixture(autouse=True)
+def event_loop() -> Iterator[asyncio.AbstractEventLoop]:
+    """Run the test and its Home Assistant instance on a fresh event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        yield loop
+    finally:
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+@pytest.fixture
+def fake_cloud() -> Iterator[FakeDrumFilterCloud]:
+    """Serve a fake cloud and point the integration at it."""
+    cloud = FakeDrumFilterCloud(record_count=10)
+    point_at(cloud.start())
+    try:
+        yield cloud
+    finally:
+        cloud.stop()
+
+@pytest.fixture
+def hass(
+    event_loop: asyncio.AbstractEventLoop, fake_cloud: FakeDrumFilterCloud, tmp_path
+) -> Iterator[HomeAssistant]:
+    """Start Home Assistant against the fake cloud and stop it after the test."""
+    instance = event_loop.run_until_complete(async_start_hass(str(tmp_path)))
+    try:
+        yield instance
+    finally:
+        event_loop.run_until_complete(instance.async_stop(force=True))
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """Shift the clock of the history and fleet statistics."""
+    shifted = Clock()
+    monkeypatch.setattr(history_module, "time", shifted)
+    monkeypatch.setattr(fleet_module, "time", shifted)
+    return shifted
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem: pytest.Function) -> bool | None:
+    """Run ``async def`` tests on the ``event_loop`` fixture."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    loop = pyfuncitem.funcargs["event_loop"]
+    arguments = {
+        name: pyfuncitem.funcargs[name]
+        for name in inspect.signature(pyfuncitem.obj).parameters
+    }
+    loop.run_until_complete(pyfuncitem.obj(**arguments))
+    return True
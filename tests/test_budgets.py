@@ -0,0 +1,49 @@
+"""Performance budgets checked against the fake cloud."""
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.core import HomeAssistant
+import pytest
+
+from benchmarks.bench_poll import bench_poll
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter.const import DOMAIN
+
+from .common import async_add_entry
+
+DEVICES = 50
+ROUNDS = 3
+
+@pytest.mark.parametrize(
+    ("batch", "per_token", "requests_per_round"),
+    [(True, 1, 1), (True, 5, 1), (False, 1, DEVICES), (False, 5, DEVICES // 5)],
+)
+async def test_poll_budget(
+    fake_cloud: FakeDrumFilterCloud,
+    batch: bool,
+    per_token: int,
+    requests_per_round: int,
+) -> None:
+    """A poll round costs one batch, or one query per token without it."""
+    fake_cloud.batch = batch
+    fake_cloud.devices_per_token = per_token
+    fake_cloud.record_count = 100
+    result = await bench_poll(fake_cloud, DEVICES, ROUNDS)
+
+    assert result["failed"] == 0
+    assert result["requests"] == requests_per_round * ROUNDS
+
+async def test_requests_per_cycle(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """Entries polled together share one request and each counts it once."""
+    entries = [await async_add_entry(hass, token) for token in "abc"]
+    coordinators = [
+        hass.data[DOMAIN][entry.entry_id]["coordinator"] for entry in entries
+    ]
+    fake_cloud.requests.clear()
+    await asyncio.gather(*(c.async_refresh() for c in coordinators))
+
+    assert fake_cloud.requests == {"query_batch": 1}
+    assert [c.last_cycle_requests for c in coordinators] == [1, 1, 1]
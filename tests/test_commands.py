@@ -0,0 +1,95 @@
+"""Tests for the DrumFilter command queue."""
+from __future__ import annotations
+
+import asyncio
+from urllib.parse import urlsplit
+
+import aiohttp
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter.commands import CommandResult
+from custom_components.drumfilter.const import DOMAIN, SERVICE_SET_INTERVAL
+
+from .common import async_add_entry, async_wait_for
+
+async def test_failed_replay_is_dropped(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """A held command is replayed once, then dropped and reported if it fails."""
+    entry = await async_add_entry(hass, "a")
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator, queue = data["coordinator"], data["commands"]["uid-a"]
+    device = fake_cloud.account("a")[0]
+
+    device["network"] = "offline"
+    await coordinator.async_refresh()
+    device_id = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "uid-a")}).id
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SET_INTERVAL,
+        {"interval": 30, "device_id": device_id},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["results"]["uid-a"]["queued"]
+    assert fake_cloud.requests["control"] == 0
+
+    fake_cloud.control_status = 400
+    device["network"] = "online"
+    await coordinator.async_refresh()
+    await async_wait_for(lambda: fake_cloud.requests["control"] == 1 and not queue.held)
+    await async_wait_for(
+        lambda: f"{DOMAIN}_uid-a_replay_failed"
+        in hass.data.get(persistent_notification.DOMAIN, {})
+    )
+
+    # 之后的轮询不再重发
+    for _ in range(3):
+        await coordinator.async_refresh()
+    await asyncio.sleep(1)
+    assert fake_cloud.requests["control"] == 1
+
+    fake_cloud.control_status = None
+    assert await queue.async_send(interval=45) is CommandResult.SENT
+    assert device["interval"] == 45
+
+async def test_timed_out_clean_is_sent_once(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """A clean that times out is neither retried, held nor sent over another transport."""
+    entry = await async_add_entry(hass, "a")
+    data = hass.data[DOMAIN][entry.entry_id]
+    api, coordinator = data["api"], data["coordinator"]
+    queue = data["commands"]["uid-a"]
+    api.cloud.timeout = aiohttp.ClientTimeout(total=0.2)
+
+    fake_cloud.latency = 0.5
+    assert await queue.async_send(clean=True) is CommandResult.FAILED
+    fake_cloud.latency = 0.0
+    for _ in range(3):
+        await coordinator.async_refresh()
+    await asyncio.sleep(1)
+    assert fake_cloud.requests["control"] == 1
+    assert not queue.held
+
+    device = FakeDrumFilterCloud(latency=0.5, local_token="a")
+    parts = urlsplit(device.start())
+    try:
+        api.attach_local(parts.hostname, parts.port)
+        api.local.timeout = aiohttp.ClientTimeout(total=0.2)
+        assert await queue.async_send(clean=True) is CommandResult.FAILED
+        assert device.requests["control"] == 1
+        assert fake_cloud.requests["control"] == 1
+
+        # 修改间隔可以安全地重发，超时后回退到云端
+        api.local.breaker.record_success()
+        assert await queue.async_send(interval=30) is CommandResult.SENT
+        assert device.requests["control"] == 2
+        assert fake_cloud.requests["control"] == 2
+        # 等待设备处理完已超时的请求再停止
+        await asyncio.sleep(0.5)
+    finally:
+        device.stop()
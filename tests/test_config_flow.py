@@ -0,0 +1,57 @@
+"""Tests for the DrumFilter config flow."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+import pytest
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components import drumfilter as integration
+from custom_components.drumfilter.const import DATA_SEEDS, DOMAIN
+
+from .common import async_add_entry
+
+async def test_user_flow_errors(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """Validation failures map to error keys and a known token aborts."""
+    fake_cloud.accounts["empty"] = []
+    await async_add_entry(hass, "a")
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": "user"}, data={"token": "empty"}
+    )
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "no_devices"}
+
+    fake_cloud.error_rate = 1.0
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"token": "b"}
+    )
+    assert result["errors"] == {"base": "cannot_connect"}
+
+    fake_cloud.error_rate = 0.0
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"token": "a"}
+    )
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "already_configured"
+
+@pytest.mark.parametrize("picked_up", [True, False])
+async def test_validated_client_is_dropped(
+    hass: HomeAssistant,
+    fake_cloud: FakeDrumFilterCloud,
+    monkeypatch: pytest.MonkeyPatch,
+    picked_up: bool,
+) -> None:
+    """The client validated by the flow does not outlive the flow."""
+    if not picked_up:
+        monkeypatch.setattr(integration, "_async_pop_seed", lambda hass, token: None)
+    queries = fake_cloud.requests["query"] + fake_cloud.requests["query_batch"]
+    entry = await async_add_entry(hass, "a")
+
+    assert hass.data[DOMAIN][entry.entry_id]["coordinator"].last_update_success
+    assert not hass.data[DOMAIN].get(DATA_SEEDS)
+    # 沿用验证时的数据不再查询；未沿用时初始化自行查询一次
+    total = fake_cloud.requests["query"] + fake_cloud.requests["query_batch"]
+    assert total - queries == (1 if picked_up else 2)
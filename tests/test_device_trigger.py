@@ -0,0 +1,88 @@
+"""Tests for the DrumFilter device triggers."""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from homeassistant.core import Context, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter import device_trigger
+from custom_components.drumfilter.const import DOMAIN
+
+from .common import async_add_entry
+
+async def test_get_triggers(hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud) -> None:
+    """Every device offers the clean reasons and network changes."""
+    await async_add_entry(hass, "a")
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "uid-a")})
+
+    triggers = await device_trigger.async_get_triggers(hass, device.id)
+    assert {trigger["type"] for trigger in triggers} == {
+        "cleaned_timing",
+        "cleaned_manual",
+        "cleaned_limit",
+        "online",
+        "offline",
+    }
+    assert all(
+        trigger["platform"] == "device"
+        and trigger["domain"] == DOMAIN
+        and trigger["device_id"] == device.id
+        for trigger in triggers
+    )
+
+async def test_attach_trigger(hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud) -> None:
+    """A trigger fires for its own device and clean reason only."""
+    fake_cloud.devices_per_token = 2
+    entry = await async_add_entry(hass, "a")
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    registry = dr.async_get(hass)
+    device = registry.async_get_device(identifiers={(DOMAIN, "uid-a-0")})
+    calls: list[dict[str, Any]] = []
+
+    @callback
+    def _action(run_variables: dict[str, Any], context: Context | None = None) -> None:
+        calls.append(run_variables["trigger"])
+
+    unsub = await device_trigger.async_attach_trigger(
+        hass,
+        device_trigger.TRIGGER_SCHEMA(
+            {
+                "platform": "device",
+                "domain": DOMAIN,
+                "device_id": device.id,
+                "type": "cleaned_manual",
+            }
+        ),
+        _action,
+        {
+            "domain": "automation",
+            "name": "test",
+            "home_assistant_start": False,
+            "variables": {},
+            "trigger_data": {"id": "0", "idx": "0", "alias": None},
+        },
+    )
+
+    now = int(time.time())
+    first, second = fake_cloud.account("a")
+    first["records"].append({"time": now, "reason": "limit"})
+    second["records"].append({"time": now, "reason": "manual"})
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert calls == []
+
+    first["records"].append({"time": now + 1, "reason": "manual"})
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert len(calls) == 1
+    assert calls[0]["event"].event_type == "drumfilter_cleaned"
+    assert calls[0]["event"].data["uid"] == "uid-a-0"
+
+    unsub()
+    first["records"].append({"time": now + 2, "reason": "manual"})
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert len(calls) == 1
@@ -0,0 +1,67 @@
+"""Tests for devices joining and leaving a DrumFilter account."""
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+import pytest
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter import async_remove_config_entry_device
+from custom_components.drumfilter.commands import CommandResult
+from custom_components.drumfilter.const import (
+    COMMAND_DEBOUNCE,
+    DEVICE_MISSING_POLLS,
+    DOMAIN,
+)
+
+from .common import async_add_entry
+
+@pytest.mark.parametrize(("batch", "etag"), [(True, False), (False, False), (False, True)])
+async def test_departed_device_is_removed(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud, batch: bool, etag: bool
+) -> None:
+    """A device missing from unchanged responses is still dropped after a few polls."""
+    fake_cloud.devices_per_token = 2
+    fake_cloud.batch = batch
+    fake_cloud.etag = etag
+    entry = await async_add_entry(hass, "a")
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    registry = dr.async_get(hass)
+
+    fake_cloud.account("a").pop()
+    for _ in range(DEVICE_MISSING_POLLS - 1):
+        await coordinator.async_refresh()
+        assert "uid-a-1" in coordinator.data
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert list(coordinator.data) == ["uid-a-0"]
+    assert registry.async_get_device(identifiers={(DOMAIN, "uid-a-1")}) is None
+    assert registry.async_get_device(identifiers={(DOMAIN, "uid-a-0")}) is not None
+
+async def test_departed_device_cleanup(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """A departed device's pending command is dropped and removal is allowed."""
+    fake_cloud.devices_per_token = 2
+    entry = await async_add_entry(hass, "a")
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator = data["coordinator"]
+    registry = dr.async_get(hass)
+    kept = registry.async_get_device(identifiers={(DOMAIN, "uid-a-0")})
+    assert not await async_remove_config_entry_device(hass, entry, kept)
+
+    pending = hass.async_create_task(data["commands"]["uid-a-1"].async_send(interval=30))
+    await asyncio.sleep(0)
+    fake_cloud.account("a").pop()
+    for _ in range(DEVICE_MISSING_POLLS):
+        await coordinator.async_refresh()
+    assert "uid-a-1" not in data["commands"]
+    assert await pending is CommandResult.FAILED
+    await asyncio.sleep(COMMAND_DEBOUNCE * 2)
+    assert fake_cloud.requests["control"] == 0
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert await async_remove_config_entry_device(hass, entry, kept)
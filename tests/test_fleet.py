@@ -0,0 +1,72 @@
+"""Tests for the domain-wide DrumFilter fleet index."""
+from __future__ import annotations
+
+from collections import Counter
+import random
+
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fake_cloud import REASONS, FakeDrumFilterCloud
+from custom_components.drumfilter.const import DATA_FLEET, DOMAIN
+from custom_components.drumfilter.history import DAY_SECONDS
+
+from .common import Clock, async_add_entry
+
+async def test_fleet_matches_recount(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud, clock: Clock
+) -> None:
+    """The fleet aggregates equal a recount over the devices of loaded entries."""
+    rng = random.Random(0)
+    entries = {}
+    for token, devices in (("a", 3), ("b", 1), ("c", 2)):
+        fake_cloud.devices_per_token = devices
+        entries[token] = await async_add_entry(hass, token)
+    fleet = hass.data[DOMAIN][DATA_FLEET]
+
+    def _recount() -> None:
+        """Compare the fleet with the devices of the loaded entries."""
+        devices = [
+            device
+            for token, entry in entries.items()
+            if entry.entry_id in hass.data[DOMAIN]
+            for device in fake_cloud.account(token)
+        ]
+        now = clock()
+        assert fleet.device_count == len(devices)
+        assert +fleet.network_counts == Counter(device["network"] for device in devices)
+        assert fleet.cleans_last_24h == sum(
+            1
+            for device in devices
+            for record in device["records"]
+            if record["time"] > now - DAY_SECONDS
+        )
+        last_cleans = [
+            (device["records"][-1]["time"], device["uid"])
+            for device in devices
+            if device["records"]
+        ]
+        assert fleet.oldest_clean == (min(last_cleans) if last_cleans else None)
+
+    _recount()
+    for step in range(60):
+        token = rng.choice(list(entries))
+        device = rng.choice(fake_cloud.account(token))
+        if rng.random() < 0.3:
+            device["network"] = rng.choice(("online", "offline"))
+        for _ in range(rng.randint(0, 3)):
+            device["records"].append(
+                {
+                    "time": max(device["records"][-1]["time"], int(clock())) + 1,
+                    "reason": rng.choice(REASONS),
+                }
+            )
+        clock.offset += rng.uniform(0, 4 * 3600)
+        if step == 40:
+            # 卸载的条目连同其设备一起从汇总中移除
+            assert await hass.config_entries.async_unload(entries["b"].entry_id)
+        for entry in entries.values():
+            if (data := hass.data[DOMAIN].get(entry.entry_id)) is not None:
+                await data["coordinator"].async_refresh()
+        # drumfilter_cleaned 事件在刷新之后才送达
+        await hass.async_block_till_done()
+        _recount()
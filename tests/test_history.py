@@ -0,0 +1,53 @@
+"""Tests for the DrumFilter cleaning history."""
+from __future__ import annotations
+
+from collections import Counter
+import random
+
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fake_cloud import REASONS, FakeDrumFilterCloud
+from custom_components.drumfilter.history import DAY_SECONDS, DrumFilterHistory
+
+from .common import Clock
+
+async def test_history_matches_recount(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud, clock: Clock
+) -> None:
+    """Every history statistic equals a recount over the records accepted so far."""
+    rng = random.Random(0)
+    history = DrumFilterHistory(hass, "stream")
+    accepted: list[tuple[float, str]] = []
+    record_time = clock() - 2 * DAY_SECONDS
+
+    for _ in range(200):
+        batch = []
+        for _ in range(rng.randint(0, 5)):
+            record_time += rng.uniform(0, 3 * 3600)
+            batch.append({"time": record_time, "reason": rng.choice(REASONS)})
+        if batch and rng.random() < 0.3:
+            # 重复、乱序或缺少时间的记录不计入
+            batch.append(dict(rng.choice(batch)))
+            batch.append({"reason": "manual"})
+        for record in batch:
+            if record.get("time") and (not accepted or record["time"] > accepted[-1][0]):
+                accepted.append((record["time"], record["reason"]))
+        history.add_records(batch)
+        clock.offset += rng.uniform(0, 6 * 3600)
+
+        now = clock()
+        reasons = Counter(reason for _, reason in accepted)
+        automatic = reasons["limit"] + reasons["timing"]
+        assert history.count == len(accepted)
+        assert history.by_reason == {reason: n for reason, n in reasons.items() if n}
+        assert history.cleans_last_24h == sum(
+            1 for t, _ in accepted if t > now - DAY_SECONDS
+        )
+        assert history.recent_times == [t for t, _ in accepted if t > now - DAY_SECONDS]
+        assert history.trigger_rate == (
+            round(reasons["limit"] / automatic * 100, 1) if automatic else None
+        )
+        if len(accepted) >= 2:
+            assert history.mean_interval == round(
+                (accepted[-1][0] - accepted[0][0]) / (len(accepted) - 1) / 60, 1
+            )
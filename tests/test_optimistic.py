@@ -0,0 +1,70 @@
+"""Tests for the optimistic values shown while a command is confirmed."""
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.core import HomeAssistant
+import pytest
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components import drumfilter as integration
+from custom_components.drumfilter.const import DOMAIN
+
+from .common import async_add_entry
+
+async def _async_coordinator(hass: HomeAssistant):
+    """Add token ``a`` and return its coordinator."""
+    entry = await async_add_entry(hass, "a")
+    return hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+async def test_value_shows_until_confirmed(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """The new value shows at once and the overlay goes once the server agrees."""
+    coordinator = await _async_coordinator(hass)
+
+    coordinator.async_set_optimistic("uid-a", interval=30)
+    assert coordinator.data["uid-a"].interval == 30
+
+    # 确认延时之前的响应还没有反映命令，保留乐观值
+    await coordinator.async_refresh()
+    assert coordinator.data["uid-a"].interval == 30
+
+    fake_cloud.account("a")[0]["interval"] = 30
+    await coordinator.async_refresh()
+    assert coordinator.data["uid-a"].interval == 30
+
+    # 确认后不再叠加，之后的变化直接显示
+    fake_cloud.account("a")[0]["interval"] = 45
+    await coordinator.async_refresh()
+    assert coordinator.data["uid-a"].interval == 45
+
+async def test_mismatched_poll_reverts(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A poll after the confirm delay that disagrees reverts to the server value."""
+    monkeypatch.setattr(integration, "OPTIMISTIC_CONFIRM_DELAY", 0.05)
+    coordinator = await _async_coordinator(hass)
+
+    coordinator.async_set_optimistic("uid-a", interval=30)
+    await asyncio.sleep(0.1)
+    # 不带新响应的重新叠加不能回退
+    coordinator.async_set_optimistic("uid-a", name="Pond")
+    assert coordinator.data["uid-a"].interval == 30
+
+    await coordinator.async_refresh()
+    assert coordinator.data["uid-a"].interval == 60
+
+async def test_timeout_reverts(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """An unconfirmed value is dropped once the deadline passes."""
+    monkeypatch.setattr(integration, "OPTIMISTIC_CONFIRM_DELAY", 10)
+    monkeypatch.setattr(integration, "OPTIMISTIC_TIMEOUT", 0.05)
+    coordinator = await _async_coordinator(hass)
+
+    coordinator.async_set_optimistic("uid-a", interval=30)
+    assert coordinator.data["uid-a"].interval == 30
+    await asyncio.sleep(0.1)
+    await coordinator.async_refresh()
+    assert coordinator.data["uid-a"].interval == 60
@@ -0,0 +1,54 @@
+"""Tests for malformed DrumFilter query responses."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+import pytest
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter.const import DOMAIN
+from custom_components.drumfilter.exceptions import DrumFilterError
+
+from .common import async_add_entry
+
+@pytest.mark.parametrize(("batch", "etag"), [(True, False), (False, False), (False, True)])
+@pytest.mark.parametrize("records", [[1, 2], 5, [{"time": "soon"}]])
+async def test_malformed_payload_is_rejected(
+    hass: HomeAssistant,
+    fake_cloud: FakeDrumFilterCloud,
+    batch: bool,
+    etag: bool,
+    records: object,
+) -> None:
+    """A malformed payload fails every poll and leaves the device state untouched."""
+    fake_cloud.batch = batch
+    fake_cloud.etag = etag
+    entry = await async_add_entry(hass, "a")
+    data = hass.data[DOMAIN][entry.entry_id]
+    coordinator, device = data["coordinator"], data["api"].devices["uid-a"]
+    state = device.as_state()
+
+    device_data = fake_cloud.account("a")[0]
+    good, device_data["records"] = device_data["records"], records
+    for _ in range(2):
+        # 第二次轮询得到相同的正文，不能被当作“未变化”而成功
+        await coordinator.async_refresh()
+        assert not coordinator.last_update_success
+        assert device.as_state() == state
+
+    device_data["records"] = good + [{"time": good[-1]["time"] + 60, "reason": "manual"}]
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    assert coordinator.data["uid-a"].total_records == len(good) + 1
+
+async def test_malformed_device_list_is_rejected(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """A device list that is not a list of objects is rejected."""
+    entry = await async_add_entry(hass, "a")
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    api = hass.data[DOMAIN][entry.entry_id]["api"]
+
+    for payload in ({"devices": "uid-a"}, {"devices": ["uid-a"]}):
+        with pytest.raises(DrumFilterError):
+            api.process_payload(payload)
+    assert list(coordinator.data) == ["uid-a"]
@@ -0,0 +1,39 @@
+"""Tests for the DrumFilter push channel."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter.const import CONF_PUSH, DOMAIN
+
+from .common import async_add_entry, async_wait_for
+
+async def test_push_updates_state_without_polling(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """Pushed payloads are applied; bad ones are skipped; unload resumes polling."""
+    entry = await async_add_entry(hass, "a", {CONF_PUSH: True})
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    await async_wait_for(lambda: coordinator.push_connected)
+    await async_wait_for(lambda: fake_cloud.subscribers.get("a"))
+    queries = fake_cloud.requests["query"] + fake_cloud.requests["query_batch"]
+
+    device = fake_cloud.account("a")[0]
+    device["interval"] = 99
+    assert await hass.async_add_executor_job(fake_cloud.push, "a") == 1
+    await async_wait_for(lambda: coordinator.data["uid-a"].interval == 99)
+
+    # 无法解析或无法应用的消息被跳过，连接保持
+    await hass.async_add_executor_job(fake_cloud.push, "a", "not json")
+    await hass.async_add_executor_job(
+        fake_cloud.push, "a", {"uid": "uid-a", "records": 5}
+    )
+    device["interval"] = 120
+    await hass.async_add_executor_job(fake_cloud.push, "a")
+    await async_wait_for(lambda: coordinator.data["uid-a"].interval == 120)
+    assert coordinator.push_connected
+    assert fake_cloud.requests["query"] + fake_cloud.requests["query_batch"] == queries
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not coordinator.push_connected
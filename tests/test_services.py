@@ -0,0 +1,76 @@
+"""Tests for the DrumFilter services."""
+from __future__ import annotations
+
+import asyncio
+from time import monotonic
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import device_registry as dr
+import pytest
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter.const import (
+    COMMAND_DEBOUNCE,
+    DATA_HUB,
+    DOMAIN,
+    SERVICE_SET_INTERVAL,
+)
+
+from .common import async_add_entry
+
+async def test_set_interval_targets(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """A call needs a target; ``entity_id: all`` reaches every device."""
+    fake_cloud.devices_per_token = 2
+    await async_add_entry(hass, "a")
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_SET_INTERVAL, {"interval": 30}, blocking=True
+        )
+    assert [device["interval"] for device in fake_cloud.account("a")] == [60, 60]
+
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "uid-a-1")})
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SET_INTERVAL,
+        {"interval": 30, "device_id": device.id},
+        blocking=True,
+        return_response=True,
+    )
+    assert list(response["results"]) == ["uid-a-1"]
+    assert [device["interval"] for device in fake_cloud.account("a")] == [60, 30]
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SET_INTERVAL,
+        {"interval": 45, "entity_id": "all"},
+        blocking=True,
+        return_response=True,
+    )
+    assert all(result["success"] for result in response["results"].values())
+    assert [device["interval"] for device in fake_cloud.account("a")] == [45, 45]
+
+async def test_concurrency_limit_skips_debounce(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """Only the requests themselves are limited, not the debounce before them."""
+    fake_cloud.devices_per_token = 3
+    await async_add_entry(hass, "a")
+    hass.data[DOMAIN][DATA_HUB].command_semaphore = asyncio.Semaphore(1)
+    fake_cloud.latency = 0.1
+
+    start = monotonic()
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SET_INTERVAL,
+        {"interval": 30, "entity_id": "all"},
+        blocking=True,
+        return_response=True,
+    )
+    elapsed = monotonic() - start
+    assert all(result["success"] for result in response["results"].values())
+    # 三个请求依次发送，合并等待只计一次
+    assert 3 * fake_cloud.latency <= elapsed - COMMAND_DEBOUNCE < 2 * COMMAND_DEBOUNCE
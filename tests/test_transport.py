@@ -0,0 +1,87 @@
+"""Tests for reaching a DrumFilter device on the local network."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from homeassistant.core import HomeAssistant
+
+from benchmarks.fake_cloud import FakeDrumFilterCloud
+from custom_components.drumfilter import DrumFilterAPI
+from custom_components.drumfilter.const import DOMAIN
+from custom_components.drumfilter.transport import TRANSPORT_CLOUD, TRANSPORT_LOCAL
+
+from .common import async_add_entry
+
+@contextmanager
+def _serve_device(api: DrumFilterAPI, token: str) -> Iterator[FakeDrumFilterCloud]:
+    """Serve a fake device proving knowledge of ``token`` and point ``api`` at it."""
+    device = FakeDrumFilterCloud(record_count=10, local_token=token)
+    parts = urlsplit(device.start())
+    try:
+        api.attach_local(parts.hostname, parts.port)
+        yield device
+    finally:
+        device.stop()
+
+async def test_local_device_is_challenged_once(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """A device that proves it knows the token is queried directly."""
+    entry = await async_add_entry(hass, "a")
+    api = hass.data[DOMAIN][entry.entry_id]["api"]
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    cloud_queries = fake_cloud.requests["query"] + fake_cloud.requests["query_batch"]
+
+    with _serve_device(api, "a") as device:
+        for _ in range(3):
+            await coordinator.async_refresh()
+            assert coordinator.last_update_success
+        assert device.requests["challenge"] == 1
+        assert device.requests["query"] == 3
+        assert api.last_transport == TRANSPORT_LOCAL
+    assert fake_cloud.requests["query"] + fake_cloud.requests["query_batch"] == cloud_queries
+
+async def test_failed_challenge_falls_back_to_cloud(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """A device that cannot prove the token never receives it."""
+    entry = await async_add_entry(hass, "a")
+    api = hass.data[DOMAIN][entry.entry_id]["api"]
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    cloud_queries = fake_cloud.requests["query"] + fake_cloud.requests["query_batch"]
+
+    with _serve_device(api, "impostor") as device:
+        await coordinator.async_refresh()
+        assert coordinator.last_update_success
+        assert device.requests["challenge"] == 1
+        assert device.requests["query"] == 0
+        assert api.last_transport == TRANSPORT_CLOUD
+        assert not api.local.verified
+    assert fake_cloud.requests["query"] + fake_cloud.requests["query_batch"] > cloud_queries
+
+async def test_device_is_challenged_again_after_failing(
+    hass: HomeAssistant, fake_cloud: FakeDrumFilterCloud
+) -> None:
+    """A device that stopped answering must prove the token again."""
+    entry = await async_add_entry(hass, "a")
+    api = hass.data[DOMAIN][entry.entry_id]["api"]
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    with _serve_device(api, "a") as device:
+        await coordinator.async_refresh()
+        assert api.local.verified
+
+        device.error_rate = 1
+        await coordinator.async_refresh()
+        assert coordinator.last_update_success
+        assert api.last_transport == TRANSPORT_CLOUD
+        assert not api.local.verified
+
+        # 冷却结束后先重新质询再发送 Token
+        device.error_rate = 0
+        api.local.breaker.record_success()
+        await coordinator.async_refresh()
+        assert device.requests["challenge"] == 2
+        assert api.last_transport == TRANSPORT_LOCAL